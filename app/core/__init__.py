@@ -1,3 +1,4 @@
-from .logging import LoggingMiddleware
+from .logging import AccessLogMiddleware, configure_access_log
+from .metrics import MetricsMiddleware
 
-__all__ = ["LoggingMiddleware"]
+__all__ = ["AccessLogMiddleware", "MetricsMiddleware", "configure_access_log"]
@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+from .metrics import CACHE_LOOKUPS
+
+V = TypeVar("V")
+
+
+def _default_sizeof(value) -> int:
+    return len(value)
+
+
+class LRUCache(Generic[V]):
+    """
+    Thread-safe LRU cache bounded by the total size of its values.
+
+    Entries are evicted least-recently-used first whenever the sum of their
+    sizes exceeds `max_bytes`. Entries may also expire after a time-to-live,
+    either the cache-wide `ttl` or a per-entry one passed to `set`.
+
+    Hit and miss counters are kept so callers can report the hit ratio. A
+    named cache also reports them in the `cache_lookups_total` metric.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl: Optional[float] = None,
+        sizeof: Callable[[V], int] = _default_sizeof,
+        name: Optional[str] = None,
+    ) -> None:
+        """
+        Initializes the cache.
+
+        Args:
+            max_bytes (int): Upper bound on the total size of cached values.
+            ttl (Optional[float]): Default time-to-live of an entry, in
+                seconds. Entries never expire when None.
+            sizeof (Callable): Returns the size of a value in bytes.
+                Defaults to `len`, which suits `bytes` and `str` values.
+            name (Optional[str]): The `cache` label of the lookup metrics.
+                Lookups are not exported when None.
+        """
+
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.current_bytes = 0
+        self._data: OrderedDict[Hashable, tuple[V, int, Optional[float]]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self._hit_metric = self._miss_metric = None
+        if name is not None:
+            self._hit_metric = CACHE_LOOKUPS.labels(name, "hit")
+            self._miss_metric = CACHE_LOOKUPS.labels(name, "miss")
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """
+        Returns the value cached for `key`, or None on a miss or if the
+        entry has expired.
+        """
+
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, _, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    if self._hit_metric is not None:
+                        self._hit_metric.inc()
+                    return value
+                self._pop(key)
+            self.misses += 1
+            if self._miss_metric is not None:
+                self._miss_metric.inc()
+            return None
+
+    def set(self, key: Hashable, value: V, ttl: Optional[float] = None) -> None:
+        """
+        Caches `value` under `key`, evicting older entries as needed.
+
+        Values larger than the whole budget are not cached.
+        """
+
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            self._data[key] = (value, size, expires_at)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                self._pop(next(iter(self._data)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.current_bytes = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def _pop(self, key: Hashable) -> None:
+        _, size, _ = self._data.pop(key)
+        self.current_bytes -= size
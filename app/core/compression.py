@@ -0,0 +1,183 @@
+import gzip
+from functools import cache, lru_cache
+from typing import Hashable, Optional
+
+from .cache import LRUCache
+
+GZIP = "gzip"
+BROTLI = "br"
+# Stored variants are compressed once, so the levels favor size over speed.
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+# Bodies compressed per request (e.g. batches) use faster levels.
+FAST_GZIP_LEVEL = 5
+FAST_BROTLI_QUALITY = 4
+
+
+@cache
+def supported_encodings() -> tuple[str, ...]:
+    """
+    Returns the content codings responses can be compressed with, preferred
+    first: Brotli when the optional `brotli` package is installed, and gzip.
+    """
+
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        return (GZIP,)
+    return (BROTLI, GZIP)
+
+
+def compress(body: bytes, encoding: str, fast: bool = False) -> bytes:
+    if encoding == BROTLI:
+        import brotli
+
+        return brotli.compress(
+            body, quality=FAST_BROTLI_QUALITY if fast else BROTLI_QUALITY
+        )
+    # A zero mtime keeps the output, and so its ETag, reproducible.
+    return gzip.compress(
+        body, compresslevel=FAST_GZIP_LEVEL if fast else GZIP_LEVEL, mtime=0
+    )
+
+
+@lru_cache(maxsize=256)
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Picks the content coding of a response from the request's
+    `Accept-Encoding` header.
+
+    The supported coding with the highest quality value wins, Brotli on a
+    tie. Codings not listed are acceptable through `*` only, and a quality
+    of 0 refuses a coding.
+
+    Returns:
+        Optional[str]: The coding to apply, or None for the identity.
+    """
+
+    if not accept_encoding:
+        return None
+    qualities: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params[:2].lower() == "q=":
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[coding.strip().lower()] = quality
+
+    chosen, best = None, 0.0
+    for encoding in supported_encodings():
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best:
+            chosen, best = encoding, quality
+    return chosen
+
+
+class EncodedBody:
+    """
+    A response body with its compressed variants, keyed by content coding.
+
+    Only variants smaller than the body are kept. The length of an
+    `EncodedBody` is the total size of the body and its variants, so it can
+    be stored in an `LRUCache` as is.
+    """
+
+    __slots__ = ("identity", "variants")
+
+    def __init__(
+        self, identity: bytes, variants: Optional[dict[str, bytes]] = None
+    ) -> None:
+        self.identity = identity
+        self.variants = variants or {}
+
+    def __len__(self) -> int:
+        return len(self.identity) + sum(map(len, self.variants.values()))
+
+    def select(self, encoding: Optional[str]) -> tuple[bytes, Optional[str]]:
+        """
+        Returns the variant for `encoding` and the coding applied to it, or
+        the identity body and None if there is no such variant.
+        """
+
+        variant = self.variants.get(encoding) if encoding else None
+        if variant is None:
+            return self.identity, None
+        return variant, encoding
+
+
+class Compressor:
+    """
+    Compresses response bodies in every supported content coding.
+
+    Bodies smaller than `min_size` bytes are not compressed: the codings'
+    framing would outweigh the savings. `encode_cached` keeps the variants
+    of bodies served repeatedly, so they are compressed only once.
+
+    Args:
+        min_size (int): Size from which bodies are compressed.
+        cache (LRUCache[EncodedBody]): Variants kept by `encode_cached`.
+    """
+
+    def __init__(self, min_size: int, cache: LRUCache[EncodedBody]) -> None:
+        self.min_size = min_size
+        self.cache = cache
+
+    def coding_for(self, body: bytes, encoding: Optional[str]) -> Optional[str]:
+        """
+        Returns the coding `body` is meant to be sent in when `encoding` was
+        negotiated, without compressing anything: None when it is too small
+        to be compressed.
+        """
+
+        return encoding if len(body) >= self.min_size else None
+
+    def encode(self, body: bytes) -> EncodedBody:
+        """
+        Returns `body` with its variants in every supported coding.
+        """
+
+        if len(body) < self.min_size:
+            return EncodedBody(body)
+        variants = {}
+        for encoding in supported_encodings():
+            variant = compress(body, encoding)
+            if len(variant) < len(body):
+                variants[encoding] = variant
+        return EncodedBody(body, variants)
+
+    def encode_cached(self, key: Hashable, body: bytes) -> EncodedBody:
+        """
+        Like `encode`, but the variants are kept under `key`, which must
+        identify the content of `body`, e.g. a digest of it.
+        """
+
+        if len(body) < self.min_size:
+            return EncodedBody(body)
+        encoded = self.cache.get(key)
+        if encoded is None:
+            encoded = self.encode(body)
+            self.cache.set(key, encoded)
+        return encoded
+
+    def compress_once(
+        self, body: bytes, encoding: Optional[str]
+    ) -> tuple[bytes, Optional[str]]:
+        """
+        Compresses a body served once in `encoding`, with a faster level
+        than stored variants.
+
+        Returns:
+            tuple[bytes, Optional[str]]: The body to send and the coding
+            applied to it, None if it was not compressed.
+        """
+
+        if encoding is None or len(body) < self.min_size:
+            return body, None
+        variant = compress(body, encoding, fast=True)
+        if len(variant) < len(body):
+            return variant, encoding
+        return body, None
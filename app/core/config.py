@@ -0,0 +1,242 @@
+import os
+import sys
+import json
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_QUOTES_FILE = Path(__file__).parent.parent / "quotes" / "data" / "quotes.json"
+
+PRODUCTION = "production"
+DEVELOPMENT = "development"
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_path(name: str) -> Optional[Path]:
+    value = os.environ.get(name)
+    return Path(value) if value else None
+
+
+def _env_list(name: str) -> tuple[str, ...]:
+    value = os.environ.get(name, "")
+    return tuple(item.strip() for item in value.split(",") if item.strip())
+
+
+def _env_sizes(
+    name: str, default: tuple[tuple[int, int], ...]
+) -> tuple[tuple[int, int], ...]:
+    sizes = []
+    for item in _env_list(name):
+        width, _, height = item.lower().partition("x")
+        sizes.append((int(width), int(height)))
+    return tuple(sizes) or default
+
+
+def _env_json_dict(name: str) -> dict[str, str]:
+    value = os.environ.get(name)
+    if not value:
+        return {}
+    data = json.loads(value)
+    if not isinstance(data, dict):
+        raise ValueError(f"{name} must be a JSON object")
+    return {str(k): str(v) for k, v in data.items()}
+
+
+def _env_environment() -> str:
+    value = os.environ.get("ENVIRONMENT")
+    if value:
+        return value.strip().lower()
+    # Without ENVIRONMENT, `fastapi dev` serves the development app and any
+    # other server (`fastapi run`, uvicorn, gunicorn) the production one.
+    return DEVELOPMENT if sys.argv[1:2] == ["dev"] else PRODUCTION
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Process-wide application settings, read once from the environment.
+
+    Attributes:
+        environment (str): `production`, where the interactive API docs are
+            disabled, or `development` (`ENVIRONMENT`). Defaults to
+            `development` under `fastapi dev` and `production` otherwise.
+        startup_profile (bool): Log the time each component takes to import
+            and initialize when a worker starts (`STARTUP_PROFILE`).
+        quotes_file (Path): Location of the JSON quote collection. Override
+            with `QUOTES_FILE` to serve a custom (possibly much larger) corpus.
+        quotes_reload (bool): Watch the quotes file and hot-reload the corpus
+            when it changes (`QUOTES_RELOAD`).
+        quotes_reload_interval (float): Seconds between two checks of the
+            quotes file (`QUOTES_RELOAD_INTERVAL`).
+        admin_token (Optional[str]): Token required by the admin endpoints
+            (`ADMIN_TOKEN`). The admin endpoints are disabled when unset.
+        avatar_timeout (float): Seconds an SVG render waits for an uncached
+            avatar before rendering without it (`AVATAR_TIMEOUT`).
+        avatar_cache_bytes (int): Memory budget of the avatar cache
+            (`AVATAR_CACHE_BYTES`).
+        avatar_cache_ttl (float): Seconds an avatar stays cached
+            (`AVATAR_CACHE_TTL`).
+        avatar_cache_dir (Optional[Path]): Directory of the on-disk cache of
+            processed avatars (`AVATAR_CACHE_DIR`). Defaults to one under the
+            system temporary directory.
+        avatar_scale (int): Pixel density (1 or 2) of the avatars embedded in
+            cards (`AVATAR_SCALE`).
+        svg_cache_bytes (int): Memory budget of the rendered SVG cache
+            (`SVG_CACHE_BYTES`).
+        compression_min_size (int): Size, in bytes, from which response
+            bodies are compressed (`COMPRESSION_MIN_SIZE`).
+        json_cache_bytes (int): Memory budget of the compressed JSON bodies
+            of quotes (`JSON_CACHE_BYTES`).
+        themes_file (Optional[Path]): JSON file of custom SVG themes to
+            register at startup (`THEMES_FILE`).
+        raster_workers (int): Number of PNG/WebP rasterization processes
+            (`RASTER_WORKERS`).
+        raster_queue (int): Rasterization jobs allowed to wait for a free
+            process before requests are rejected with 503 (`RASTER_QUEUE`).
+        render_workers (int): Number of threads laying out SVG cards
+            (`RENDER_WORKERS`).
+        render_queue (int): SVG renders allowed to wait for a free thread
+            before requests are rejected with 503 (`RENDER_QUEUE`).
+        raster_cache_bytes (int): Memory budget of the PNG/WebP image cache
+            (`RASTER_CACHE_BYTES`).
+        warmup (bool): Pre-render the SVG cards of every quote in the
+            background at startup and after each corpus change (`WARMUP`).
+        warmup_themes (tuple[str, ...]): Themes to pre-render, e.g.
+            `light,dark` (`WARMUP_THEMES`). All registered themes when empty.
+        warmup_sizes (tuple[tuple[int, int], ...]): Card sizes to
+            pre-render, e.g. `400x175,600x300` (`WARMUP_SIZES`).
+        warmup_concurrency (int): Quotes pre-rendered concurrently
+            (`WARMUP_CONCURRENCY`).
+        access_log (bool): Write a JSON line per request to stderr
+            (`ACCESS_LOG`).
+        access_log_sample_rate (float): Fraction of requests written to the
+            access log; server errors are always logged
+            (`ACCESS_LOG_SAMPLE_RATE`).
+        rate_limits (str): Default rate limits of every route, per client,
+            separated by `;` (`RATE_LIMITS`).
+        rate_limits_by_route (dict[str, str]): Rate limits overriding the
+            default for some routes, keyed by route path template, e.g.
+            `{"/api/quotes/{id}": "100 per minute"}` (`RATE_LIMITS_BY_ROUTE`,
+            JSON).
+        api_keys (dict[str, str]): Rate limits of the clients sending a known
+            key in the `X-API-Key` header, keyed by API key. They are limited
+            per key rather than per IP address (`API_KEYS`, JSON).
+        rate_limit_storage (str): Where rate-limit counters are kept
+            (`RATE_LIMIT_STORAGE`): `memory://` in each process, `shm://`
+            shared by the workers of a host, or `redis://host:port` shared by
+            every node.
+        rate_limit_strategy (str): `sliding-window-counter`, `fixed-window`
+            or `moving-window` (`RATE_LIMIT_STRATEGY`). Every storage
+            supports the first two; `moving-window` needs `memory://` or
+            `redis://`, and the service fails to start if it is combined
+            with `shm://`.
+    """
+
+    environment: str = PRODUCTION
+    startup_profile: bool = False
+    quotes_file: Path = DEFAULT_QUOTES_FILE
+    quotes_reload: bool = False
+    quotes_reload_interval: float = 2.0
+    admin_token: Optional[str] = None
+    avatar_timeout: float = 2.0
+    avatar_cache_bytes: int = 16 * 1024 * 1024
+    avatar_cache_ttl: float = 24 * 3600
+    avatar_cache_dir: Optional[Path] = None
+    avatar_scale: int = 2
+    svg_cache_bytes: int = 64 * 1024 * 1024
+    compression_min_size: int = 1024
+    json_cache_bytes: int = 16 * 1024 * 1024
+    themes_file: Optional[Path] = None
+    raster_workers: int = 2
+    raster_queue: int = 8
+    render_workers: int = 2
+    render_queue: int = 512
+    raster_cache_bytes: int = 64 * 1024 * 1024
+    warmup: bool = False
+    warmup_themes: tuple[str, ...] = ()
+    warmup_sizes: tuple[tuple[int, int], ...] = ((400, 175),)
+    warmup_concurrency: int = 8
+    access_log: bool = True
+    access_log_sample_rate: float = 1.0
+    rate_limits: str = "200 per day;60 per hour;2 per minute"
+    rate_limits_by_route: dict[str, str] = field(default_factory=dict)
+    api_keys: dict[str, str] = field(default_factory=dict)
+    rate_limit_storage: str = "memory://"
+    rate_limit_strategy: str = "sliding-window-counter"
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """
+        Builds a Settings instance from environment variables, falling back
+        to the defaults declared on the class.
+        """
+
+        return cls(
+            environment=_env_environment(),
+            startup_profile=_env_bool("STARTUP_PROFILE", cls.startup_profile),
+            quotes_file=Path(os.environ.get("QUOTES_FILE", DEFAULT_QUOTES_FILE)),
+            quotes_reload=_env_bool("QUOTES_RELOAD", cls.quotes_reload),
+            quotes_reload_interval=float(
+                os.environ.get("QUOTES_RELOAD_INTERVAL", cls.quotes_reload_interval)
+            ),
+            admin_token=os.environ.get("ADMIN_TOKEN") or None,
+            avatar_timeout=float(os.environ.get("AVATAR_TIMEOUT", cls.avatar_timeout)),
+            avatar_cache_bytes=int(
+                os.environ.get("AVATAR_CACHE_BYTES", cls.avatar_cache_bytes)
+            ),
+            avatar_cache_ttl=float(
+                os.environ.get("AVATAR_CACHE_TTL", cls.avatar_cache_ttl)
+            ),
+            avatar_cache_dir=_env_path("AVATAR_CACHE_DIR"),
+            avatar_scale=int(os.environ.get("AVATAR_SCALE", cls.avatar_scale)),
+            svg_cache_bytes=int(os.environ.get("SVG_CACHE_BYTES", cls.svg_cache_bytes)),
+            compression_min_size=int(
+                os.environ.get("COMPRESSION_MIN_SIZE", cls.compression_min_size)
+            ),
+            json_cache_bytes=int(
+                os.environ.get("JSON_CACHE_BYTES", cls.json_cache_bytes)
+            ),
+            themes_file=_env_path("THEMES_FILE"),
+            raster_workers=int(os.environ.get("RASTER_WORKERS", cls.raster_workers)),
+            raster_queue=int(os.environ.get("RASTER_QUEUE", cls.raster_queue)),
+            render_workers=int(os.environ.get("RENDER_WORKERS", cls.render_workers)),
+            render_queue=int(os.environ.get("RENDER_QUEUE", cls.render_queue)),
+            raster_cache_bytes=int(
+                os.environ.get("RASTER_CACHE_BYTES", cls.raster_cache_bytes)
+            ),
+            warmup=_env_bool("WARMUP", cls.warmup),
+            warmup_themes=_env_list("WARMUP_THEMES"),
+            warmup_sizes=_env_sizes("WARMUP_SIZES", cls.warmup_sizes),
+            warmup_concurrency=int(
+                os.environ.get("WARMUP_CONCURRENCY", cls.warmup_concurrency)
+            ),
+            access_log=_env_bool("ACCESS_LOG", cls.access_log),
+            access_log_sample_rate=float(
+                os.environ.get("ACCESS_LOG_SAMPLE_RATE", cls.access_log_sample_rate)
+            ),
+            rate_limits=os.environ.get("RATE_LIMITS", cls.rate_limits),
+            rate_limits_by_route=_env_json_dict("RATE_LIMITS_BY_ROUTE"),
+            api_keys=_env_json_dict("API_KEYS"),
+            rate_limit_storage=os.environ.get(
+                "RATE_LIMIT_STORAGE", cls.rate_limit_storage
+            ),
+            rate_limit_strategy=os.environ.get(
+                "RATE_LIMIT_STRATEGY", cls.rate_limit_strategy
+            ),
+        )
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """
+    Returns the cached, process-wide Settings instance.
+    """
+
+    return Settings.from_env()
@@ -1,61 +1,176 @@
+import os
+import json
 import time
-import uuid
+import queue
+import random
 import logging
-from typing import Awaitable, Callable
+import itertools
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
 
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-logger = logging.getLogger("uvicorn.access")
+logger = logging.getLogger("app.access")
 
+# Incoming request ids are echoed back and logged, so only short, printable
+# values are honoured; anything else is replaced by a generated id.
+MAX_REQUEST_ID_LENGTH = 128
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(
-        self, request: Request, call_next: Callable[[Request], Awaitable[Response]]
-    ):
-        """
-        Logs incoming requests and outgoing responses.
 
-        This middleware captures and logs key information about each request
-        and its corresponding response, including:
-        - A unique request ID for tracing.
-        - Request details: method, URL, client IP, user agent, query parameters,
-          and body size.
-        - Response details: status code and the time taken to process the request.
+class JSONLinesFormatter(logging.Formatter):
+    """
+    Formats access records as one JSON object per line.
 
-        A unique `X-Request-ID` header is added to the response for easy
-        correlation with the logs.
+    The fields of the access entry are read from the `access` attribute set
+    by `AccessLogMiddleware`; records without one are logged with their
+    message only.
+    """
 
-        Args:
-            request (Request): The incoming request object.
-            call_next (Callable): The next middleware or route handler in the chain.
+    def format(self, record: logging.LogRecord) -> str:
+        entry = getattr(record, "access", None)
+        if entry is None:
+            entry = {"message": record.getMessage()}
+        return json.dumps(
+            {"ts": round(record.created, 3), "level": record.levelname, **entry},
+            separators=(",", ":"),
+            ensure_ascii=False,
+        )
 
-        Returns:
-            Response: The response object to be returned to the client.
-        """
 
-        request_id: str = str(uuid.uuid4())
-        start_time = time.time()
+class _AccessQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The default implementation formats the message on the caller's
+        # thread; access records are serialized by the listener instead.
+        return record
 
-        client_host: str = request.client.host if request.client else "unknown"
-        user_agent: str = request.headers.get("user-agent", "-")
-        body = await request.body()
-        body_size: int = len(body) if body else 0
 
-        logger.info(
-            f"➡️ [{request_id}] {request.method} {request.url.path}"
-            f" | IP: {client_host} | User Agent: {user_agent}"
-            f" | Query: {dict(request.query_params)}"
-            f" | Size: {body_size} bytes"
-        )
+def configure_access_log(
+    handler: Optional[logging.Handler] = None,
+) -> QueueListener:
+    """
+    Routes the access logger through a queue drained by a background thread.
+
+    Request handling only puts the record on an unbounded in-memory queue;
+    JSON serialization and the write to `handler` (stderr by default) happen
+    on the listener thread. The returned listener is started, and must be
+    stopped on shutdown to flush pending records.
+
+    Args:
+        handler (Optional[logging.Handler]): The handler writing the lines.
+
+    Returns:
+        QueueListener: The started listener.
+    """
+
+    if handler is None:
+        handler = logging.StreamHandler()
+    handler.setFormatter(JSONLinesFormatter())
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    logger.handlers[:] = [_AccessQueueHandler(log_queue)]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    listener = QueueListener(log_queue, handler)
+    listener.start()
+    return listener
+
+
+class AccessLogMiddleware:
+    """
+    Pure ASGI middleware logging one structured entry per HTTP request.
 
-        response = await call_next(request)
-        duration = (time.time() - start_time) * 1000
+    Each entry records the request id, method, path, query string, client,
+    user agent, request size (from `Content-Length`, the body is never
+    read), status, response size and duration. An incoming `X-Request-ID`
+    header is honoured, otherwise a cheap process-unique id is generated;
+    either way it is sent back in the `X-Request-ID` response header.
+
+    With `sample_rate` below 1, only that fraction of requests is logged;
+    server errors are always logged.
+
+    Args:
+        app (ASGIApp): The wrapped application.
+        sample_rate (float): Fraction of requests to log, between 0 and 1.
+    """
+
+    def __init__(self, app: ASGIApp, sample_rate: float = 1.0) -> None:
+        self.app = app
+        self.sample_rate = sample_rate
+        self._id_prefix = os.urandom(4).hex()
+        self._ids = itertools.count(1)
+
+    def _request_id(self, scope: Scope) -> bytes:
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                if len(value) <= MAX_REQUEST_ID_LENGTH and value.isascii():
+                    if value.decode("ascii").isprintable():
+                        return value
+                break
+        return f"{self._id_prefix}-{next(self._ids):x}".encode("ascii")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter_ns()
+        request_id = self._request_id(scope)
+        status_code = 500
+        response_size = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (b"x-request-id", request_id),
+                ]
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if logger.isEnabledFor(logging.INFO) and (
+                status_code >= 500 or random.random() < self.sample_rate
+            ):
+                self._log(scope, request_id, status_code, response_size, start)
+
+    def _log(
+        self,
+        scope: Scope,
+        request_id: bytes,
+        status_code: int,
+        response_size: int,
+        start: int,
+    ) -> None:
+        duration_ns = time.perf_counter_ns() - start
+        user_agent = "-"
+        request_size = 0
+        for name, value in scope["headers"]:
+            if name == b"user-agent":
+                user_agent = value.decode("latin-1")
+            elif name == b"content-length" and value.isdigit():
+                request_size = int(value)
+        client = scope.get("client")
 
         logger.info(
-            f"⬅️ [{request_id}] {request.method} {request.url.path}"
-            f" | Status: {response.status_code} | Time: {duration:.2f} ms"
+            "access",
+            extra={
+                "access": {
+                    "request_id": request_id.decode("ascii"),
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "query": scope["query_string"].decode("latin-1"),
+                    "client": client[0] if client else None,
+                    "user_agent": user_agent,
+                    "request_size": request_size,
+                    "status": status_code,
+                    "response_size": response_size,
+                    "duration_ms": round(duration_ns / 1e6, 3),
+                }
+            },
         )
-
-        response.headers["X-Request-ID"] = request_id
-        return response
@@ -0,0 +1,172 @@
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# When set (before the workers start), every worker records its metrics in
+# its own memory-mapped files in this directory, and a scrape served by any
+# worker aggregates the files of all of them.
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+RESPONSE_TYPES = frozenset(("json", "svg", "png", "webp"))
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests handled, by route template, method, status and response type.",
+    ["route", "method", "status", "response_type"],
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling an HTTP request, by route template and response type.",
+    ["route", "response_type"],
+    buckets=LATENCY_BUCKETS,
+)
+RENDER_DURATION = Histogram(
+    "quote_render_duration_seconds",
+    "Time spent rendering a quote card, excluding the avatar fetch.",
+    ["format"],
+    buckets=LATENCY_BUCKETS,
+)
+RENDER_QUEUE_DURATION = Histogram(
+    "quote_render_queue_duration_seconds",
+    "Time SVG renders wait for a thread of the render pool.",
+    buckets=LATENCY_BUCKETS,
+)
+AVATAR_FETCH_DURATION = Histogram(
+    "avatar_fetch_duration_seconds",
+    "Latency of upstream avatar fetches, by outcome.",
+    ["outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total",
+    "Cache lookups by cache and result; the hit ratio is hit / (hit + miss).",
+    ["cache", "result"],
+)
+CORPUS_SIZE = Gauge(
+    "quote_corpus_size",
+    "Number of quotes in the corpus being served.",
+    multiprocess_mode="livemostrecent",
+)
+CORPUS_LOAD_DURATION = Gauge(
+    "quote_corpus_load_duration_seconds",
+    "Time spent loading and indexing the corpus being served.",
+    multiprocess_mode="livemostrecent",
+)
+RATE_LIMIT_REJECTIONS = Counter(
+    "rate_limit_rejections_total",
+    "Requests rejected by the rate limiter, by route template.",
+    ["route"],
+)
+
+
+def route_template(scope: Scope) -> str:
+    """
+    Returns the path template of the route that handled the request, e.g.
+    `/api/quotes/{id}`, so that label cardinality stays bounded. Requests
+    that matched no route are grouped under `unmatched`.
+    """
+
+    route = scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """
+    Serializes the current metrics in the Prometheus text format.
+
+    In multi-process mode the metrics files of every worker, including the
+    ones that exited, are merged at scrape time; recording never reads them.
+
+    Returns:
+        tuple[bytes, str]: The exposition body and its content type.
+    """
+
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_worker_dead() -> None:
+    """
+    Drops the live gauges of the current worker on shutdown, so they stop
+    being reported. Its counters and histograms keep being aggregated.
+    """
+
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording the count and latency of every HTTP
+    request, labelled by route template and `response_type`.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = route_template(scope)
+            response_type = _response_type(scope["query_string"])
+            HTTP_REQUESTS.labels(
+                route, scope["method"], str(status_code), response_type
+            ).inc()
+            HTTP_REQUEST_DURATION.labels(route, response_type).observe(
+                time.perf_counter() - start
+            )
+
+
+def _response_type(query_string: bytes) -> str:
+    if b"response_type=" not in query_string:
+        return "json"
+    for pair in query_string.split(b"&"):
+        name, _, value = pair.partition(b"=")
+        if name == b"response_type":
+            value = value.decode("latin-1")
+            return value if value in RESPONSE_TYPES else "other"
+    return "json"
@@ -0,0 +1,231 @@
+import os
+import mmap
+import time
+import fcntl
+import struct
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+from math import floor
+from typing import Iterator, Optional
+from urllib.parse import parse_qs, urlparse
+
+from limits.storage import Storage
+from limits.storage.base import SlidingWindowCounterSupport, TimestampedSlidingWindow
+
+# One slot per rate-limit counter: key hash, count, expiry (epoch seconds).
+_SLOT = struct.Struct("<Qqd")
+DEFAULT_SLOTS = 65536
+# Slots probed before an insertion evicts the entry closest to expiring.
+MAX_PROBE = 32
+
+
+def _default_path() -> str:
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "finance-quote-api.ratelimit")
+
+
+def _key_hash(key: str) -> int:
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    # 0 marks an empty slot.
+    return int.from_bytes(digest, "little") or 1
+
+
+class SharedMemoryStorage(
+    Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow
+):
+    """
+    Rate-limit storage shared by every worker process of one host.
+
+    Counters live in a fixed-size, open-addressed hash table in a
+    memory-mapped file (under `/dev/shm` when available), so all the uvicorn
+    workers of a host enforce a single limit instead of one each. Access is
+    serialized by an advisory `flock` on the file, plus a thread lock within
+    a process. Expired slots are reused; when a probe sequence is full, the
+    counter closest to expiring is evicted, so the table never grows.
+
+    Registered with `limits` under the `shm` scheme, e.g.
+    `shm:///dev/shm/quotes.ratelimit?slots=65536`. Supports the fixed-window
+    and sliding-window-counter strategies.
+    """
+
+    STORAGE_SCHEME = ["shm"]
+
+    def __init__(
+        self,
+        uri: Optional[str] = None,
+        wrap_exceptions: bool = False,
+        **options,
+    ) -> None:
+        parsed = urlparse(uri or "shm://")
+        path = parsed.path or _default_path()
+        query = parse_qs(parsed.query)
+        slots = int(query.get("slots", [options.pop("slots", DEFAULT_SLOTS)])[0])
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._file_lock():
+            if os.fstat(self._fd).st_size < slots * _SLOT.size:
+                os.ftruncate(self._fd, slots * _SLOT.size)
+            size = os.fstat(self._fd).st_size
+        # Workers agree on the table size through the file, whatever their
+        # own configuration.
+        self._slots = size // _SLOT.size
+        self._map = mmap.mmap(self._fd, self._slots * _SLOT.size)
+        self._lock = threading.Lock()
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self) -> tuple[type[Exception], ...]:
+        return (OSError, ValueError)
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._lock, self._file_lock():
+            yield
+
+    def _find(self, key: str, now: float, create: bool) -> Optional[int]:
+        """
+        Returns the offset of the slot holding `key`, or, with `create`, of a
+        free slot for it. Must be called with the lock held.
+        """
+
+        key_hash = _key_hash(key)
+        start = key_hash % self._slots
+        free = None
+        oldest, oldest_expiry = None, float("inf")
+        for i in range(min(MAX_PROBE, self._slots)):
+            offset = ((start + i) % self._slots) * _SLOT.size
+            slot_hash, _, expires_at = _SLOT.unpack_from(self._map, offset)
+            if slot_hash == key_hash:
+                return offset
+            if slot_hash == 0:
+                if free is None:
+                    free = offset
+                break
+            if free is None and expires_at <= now:
+                free = offset
+            if expires_at < oldest_expiry:
+                oldest, oldest_expiry = offset, expires_at
+        if not create:
+            return None
+        offset = free if free is not None else oldest
+        _SLOT.pack_into(self._map, offset, key_hash, 0, 0.0)
+        return offset
+
+    def _read(self, key: str, now: float) -> tuple[int, float]:
+        offset = self._find(key, now, create=False)
+        if offset is None:
+            return 0, now
+        _, count, expires_at = _SLOT.unpack_from(self._map, offset)
+        if expires_at <= now:
+            return 0, now
+        return count, expires_at
+
+    def _incr(self, key: str, expiry: float, amount: int, now: float) -> int:
+        offset = self._find(key, now, create=True)
+        key_hash, count, expires_at = _SLOT.unpack_from(self._map, offset)
+        if expires_at <= now:
+            count, expires_at = 0, now + expiry
+        count += amount
+        _SLOT.pack_into(self._map, offset, key_hash, count, expires_at)
+        return count
+
+    def incr(self, key: str, expiry: float, amount: int = 1) -> int:
+        with self._locked():
+            return self._incr(key, expiry, amount, time.time())
+
+    def decr(self, key: str, amount: int = 1) -> int:
+        with self._locked():
+            now = time.time()
+            offset = self._find(key, now, create=False)
+            if offset is None:
+                return 0
+            key_hash, count, expires_at = _SLOT.unpack_from(self._map, offset)
+            if expires_at <= now:
+                return 0
+            count = max(count - amount, 0)
+            _SLOT.pack_into(self._map, offset, key_hash, count, expires_at)
+            return count
+
+    def get(self, key: str) -> int:
+        with self._locked():
+            return self._read(key, time.time())[0]
+
+    def get_expiry(self, key: str) -> float:
+        with self._locked():
+            return self._read(key, time.time())[1]
+
+    def clear(self, key: str) -> None:
+        with self._locked():
+            offset = self._find(key, time.time(), create=False)
+            if offset is not None:
+                # Keep the hash so the probe sequences of other keys that
+                # went past this slot stay intact; the entry is now expired.
+                key_hash = _SLOT.unpack_from(self._map, offset)[0]
+                _SLOT.pack_into(self._map, offset, key_hash, 0, 0.0)
+
+    def check(self) -> bool:
+        return not self._map.closed
+
+    def reset(self) -> int:
+        with self._locked():
+            now = time.time()
+            live = sum(
+                1
+                for _, count, expires_at in _SLOT.iter_unpack(self._map)
+                if count and expires_at > now
+            )
+            self._map[:] = bytes(len(self._map))
+            return live
+
+    def _sliding_window(
+        self, key: str, expiry: int, now: float
+    ) -> tuple[int, float, int, float]:
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        previous_count = self._read(previous_key, now)[0]
+        current_count = self._read(current_key, now)[0]
+        if previous_count == 0:
+            previous_ttl = 0.0
+        else:
+            previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def acquire_sliding_window_entry(
+        self, key: str, limit: int, expiry: int, amount: int = 1
+    ) -> bool:
+        if amount > limit:
+            return False
+        # Reading both windows and incrementing happen under one lock, so
+        # concurrent workers can never overshoot the limit.
+        with self._locked():
+            now = time.time()
+            previous_count, previous_ttl, current_count, _ = self._sliding_window(
+                key, expiry, now
+            )
+            weighted_count = previous_count * previous_ttl / expiry + current_count
+            if floor(weighted_count) + amount > limit:
+                return False
+            _, current_key = self.sliding_window_keys(key, expiry, now)
+            self._incr(current_key, 2 * expiry, amount, now)
+            return True
+
+    def get_sliding_window(
+        self, key: str, expiry: int
+    ) -> tuple[int, float, int, float]:
+        with self._locked():
+            return self._sliding_window(key, expiry, time.time())
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        previous_key, current_key = self.sliding_window_keys(key, expiry, time.time())
+        self.clear(previous_key)
+        self.clear(current_key)
@@ -1,39 +1,360 @@
-import re
+import math
+import time
+import hashlib
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Optional, Union
 
-from fastapi import status, Request
+from anyio import to_thread
+from fastapi import Request
+from limits import RateLimitItem, parse_many
+from limits.storage import MemoryStorage, Storage, storage_from_string
+from limits.strategies import STRATEGIES, RateLimiter as RateLimitStrategy
+from starlette.routing import BaseRoute, Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from fastapi.responses import JSONResponse
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+from .config import get_settings
+from .metrics import RATE_LIMIT_REJECTIONS
+from .rate_limit_storage import SharedMemoryStorage
 
-limiter = Limiter(
-    key_func=get_remote_address,
-    default_limits=["200 per day", "60 per hour", "2 per minute"],
+API_KEY_HEADER = b"x-api-key"
+API_KEY_PREFIX = "key:"
+
+# A batch call costs one hit per started group of this many quotes.
+BATCH_WEIGHT_STEP = 10
+# An export costs one hit per started group of this many quotes of its
+# `limit`, which defaults to (and is capped at) these sizes.
+EXPORT_WEIGHT_STEP = 1000
+DEFAULT_EXPORT_SIZE = 10_000
+MAX_EXPORT_SIZE = 100_000
+# Limits of the export route, in hits: 1M quotes per hour.
+EXPORT_RATE_LIMITS = "100 per minute;1000 per hour"
+
+Cost = Union[int, Callable[[Request], int]]
+
+# The 429 response is assembled from these pre-encoded parts, so rejecting
+# a request costs no JSON serialization or Response object.
+_REJECTION_BODY_HEAD = (
+    b'{"detail":"Rate limit exceeded. Please try again later.","retry_after_seconds":'
 )
+_REJECTION_HEADERS = [(b"content-type", b"application/json")]
+
+
+def _api_key_id(api_key: bytes) -> str:
+    # API keys never reach the rate-limit storage (e.g. Redis) in clear.
+    return API_KEY_PREFIX + hashlib.blake2b(api_key, digest_size=8).hexdigest()
+
+
+@lru_cache
+def _api_key_limits() -> dict[str, str]:
+    return {_api_key_id(k.encode()): v for k, v in get_settings().api_keys.items()}
+
+
+@lru_cache(maxsize=64)
+def _parse_limits(limits: str) -> tuple[RateLimitItem, ...]:
+    return tuple(parse_many(limits))
+
+
+def rate_limit_key(scope: Scope) -> str:
+    """
+    Returns the identity a request is rate limited under: its API key when
+    it sends a configured one in the `X-API-Key` header, otherwise the
+    client IP address.
+    """
+
+    for name, value in scope["headers"]:
+        if name == API_KEY_HEADER:
+            key_id = _api_key_id(value)
+            if key_id in _api_key_limits():
+                return key_id
+            break
+    client = scope.get("client")
+    return client[0] if client else "127.0.0.1"
+
+
+@dataclass(frozen=True)
+class RouteLimit:
+    """
+    Rate-limit policy of one route.
+
+    Attributes:
+        limits (Optional[str]): Limits declared in code, `;`-separated.
+            When None, the configured defaults apply.
+        cost (Cost): Hits a request counts for, or a callable computing
+            them from the request.
+    """
+
+    limits: Optional[str]
+    cost: Cost
+
+
+@dataclass(frozen=True)
+class RateLimitStatus:
+    """
+    Outcome of a rate-limit check, for the most restrictive limit.
+
+    Attributes:
+        allowed (bool): Whether the request may proceed.
+        limit (int): The number of requests allowed in the window.
+        remaining (int): Requests left in the window.
+        reset_after (int): Seconds until a request is allowed again.
+    """
+
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: int
+
+    @property
+    def headers(self) -> list[tuple[bytes, bytes]]:
+        return [
+            (b"x-ratelimit-limit", b"%d" % self.limit),
+            (b"x-ratelimit-remaining", b"%d" % self.remaining),
+            (b"x-ratelimit-reset", b"%d" % self.reset_after),
+        ]
+
+
+class RateLimiter:
+    """
+    Rate limits requests per route and per client identity.
+
+    Routes opt in with the `limit` decorator; `RateLimitMiddleware` checks
+    the limits before routing, so rejected requests never reach validation,
+    dependencies or handlers. The limits of a request are, by priority: the
+    ones of its API key, the ones configured for its route in
+    `RATE_LIMITS_BY_ROUTE`, the ones declared on the route, and finally
+    `RATE_LIMITS`.
+
+    Counters are kept in a `limits` storage (`memory://`, `shm://` or
+    `redis://`) and counted with the configured strategy. Routes register
+    at import time, but the storage is only opened by `setup`, once per
+    worker, at startup or on the first rate-limited request.
+    """
+
+    def __init__(self) -> None:
+        self.storage: Optional[Storage] = None
+        self.strategy: Optional[RateLimitStrategy] = None
+        self.in_process = True
+        self.routes: dict[Callable, RouteLimit] = {}
+
+    def setup(
+        self, storage_uri: Optional[str] = None, strategy: Optional[str] = None
+    ) -> None:
+        """
+        Opens the counters' storage and strategy, unless already done.
+
+        Args:
+            storage_uri (Optional[str]): Defaults to `RATE_LIMIT_STORAGE`.
+            strategy (Optional[str]): Defaults to `RATE_LIMIT_STRATEGY`.
+
+        Raises:
+            ValueError: If the strategy is unknown, or not supported by the
+                storage, e.g. `moving-window` with `shm://`.
+        """
+
+        if self.strategy is not None:
+            return
+        settings = get_settings()
+        storage_uri = storage_uri or settings.rate_limit_storage
+        strategy = strategy or settings.rate_limit_strategy
+        if strategy not in STRATEGIES:
+            raise ValueError(
+                f"Unknown rate-limit strategy {strategy!r}, expected one of"
+                f" {', '.join(STRATEGIES)}"
+            )
+        storage = storage_from_string(storage_uri)
+        try:
+            self.strategy = STRATEGIES[strategy](storage)
+        except NotImplementedError:
+            raise ValueError(
+                f"The {strategy!r} rate-limit strategy is not supported by the"
+                f" storage {storage_uri!r}"
+            )
+        self.storage = storage
+        # In-process storages are checked inline; network ones in a thread
+        # so that a round trip never blocks the event loop.
+        self.in_process = isinstance(storage, (MemoryStorage, SharedMemoryStorage))
+
+    def limit(
+        self, limits: Optional[str] = None, cost: Cost = 1
+    ) -> Callable[[Callable], Callable]:
+        """
+        Decorator enabling rate limiting on a route handler.
+
+        Args:
+            limits (Optional[str]): Limits of the route, e.g.
+                `"10 per minute;100 per day"`. Defaults to `RATE_LIMITS`.
+            cost (Cost): Hits a request counts for, or a callable computing
+                them from the request.
+        """
+
+        def decorator(func: Callable) -> Callable:
+            self.routes[func] = RouteLimit(limits, cost)
+            return func
+
+        return decorator
+
+    def limits_for(self, identity: str, route: str, route_limit: RouteLimit) -> str:
+        if identity.startswith(API_KEY_PREFIX):
+            return _api_key_limits()[identity]
+        settings = get_settings()
+        configured = settings.rate_limits_by_route.get(route)
+        return configured or route_limit.limits or settings.rate_limits
+
+    def hit(self, scope: Scope, route: str, route_limit: RouteLimit) -> RateLimitStatus:
+        """
+        Counts the request against every limit of its route and identity.
+
+        Limits are checked from the first declared; checking stops at the
+        first one exceeded. The returned status describes the exceeded limit,
+        or else the one with the fewest remaining requests.
+
+        The cost is capped at the amount of each limit, separately: a batch
+        weighing 10 hits under `60 per hour;2 per minute` counts for 10
+        against the hourly limit and 2 against the minute one, which it uses
+        up rather than being rejected by a limit it could never fit in.
+        """
+
+        identity = rate_limit_key(scope)
+        cost = route_limit.cost
+        if callable(cost):
+            cost = cost(Request(scope))
+        now = time.time()
+
+        status = None
+        for item in _parse_limits(self.limits_for(identity, route, route_limit)):
+            allowed = self.strategy.hit(
+                item, identity, route, cost=min(cost, item.amount)
+            )
+            reset_at, remaining = self.strategy.get_window_stats(item, identity, route)
+            if status is None or not allowed or remaining < status.remaining:
+                status = RateLimitStatus(
+                    allowed=allowed,
+                    limit=item.amount,
+                    remaining=max(remaining, 0),
+                    reset_after=max(1, math.ceil(reset_at - now)),
+                )
+            if not allowed:
+                break
+        return status
+
+
+def batch_cost(request: Request) -> int:
+    """
+    Returns the rate-limit cost of a batch request.
+
+    A batch counts as one call weighted by its size: one hit per started
+    group of `BATCH_WEIGHT_STEP` quotes, taken from the `ids` or `count`
+    query parameter. It runs before the parameters are validated, so an
+    invalid `count` costs one hit and is then rejected by the route.
+    """
+
+    ids = request.query_params.get("ids")
+    if ids:
+        size = ids.count(",") + 1
+    else:
+        try:
+            size = int(request.query_params.get("count", 1))
+        except ValueError:
+            size = 1
+    return max(1, -(-size // BATCH_WEIGHT_STEP))
+
+
+def export_cost(request: Request) -> int:
+    """
+    Returns the rate-limit cost of an export request: one hit per started
+    group of `EXPORT_WEIGHT_STEP` quotes of its `limit` query parameter
+    (`DEFAULT_EXPORT_SIZE` when absent or invalid). Streaming a large
+    export thus counts as many calls, and the number of quotes a client
+    can stream, rather than its number of exports, is bounded.
+    """
+
+    try:
+        size = int(request.query_params.get("limit", DEFAULT_EXPORT_SIZE))
+    except ValueError:
+        size = DEFAULT_EXPORT_SIZE
+    size = min(max(size, 1), MAX_EXPORT_SIZE)
+    return -(-size // EXPORT_WEIGHT_STEP)
+
+
+def _find_route(routes: list[BaseRoute], scope: Scope) -> Optional[BaseRoute]:
+    for route in routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route
+    return None
+
+
+class RateLimitMiddleware:
+    """
+    Pure ASGI middleware enforcing the limits of `RateLimiter`.
+
+    Rate-limited routes get `X-RateLimit-Limit`, `X-RateLimit-Remaining`
+    and `X-RateLimit-Reset` (seconds) headers on every response. Rejections
+    are answered here with a `429` and an exact `Retry-After`, built from
+    pre-encoded bytes.
+
+    Args:
+        app (ASGIApp): The wrapped application.
+        limiter (RateLimiter): The limiter holding the route policies.
+    """
+
+    def __init__(self, app: ASGIApp, limiter: RateLimiter) -> None:
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.limiter.routes:
+            await self.app(scope, receive, send)
+            return
+
+        route = _find_route(scope["app"].routes, scope)
+        route_limit = self.limiter.routes.get(getattr(route, "endpoint", None))
+        if route_limit is None:
+            await self.app(scope, receive, send)
+            return
+        if self.limiter.strategy is None:
+            self.limiter.setup()
+
+        # Lets the metrics label the request with its route even if it is
+        # rejected before routing.
+        scope["route"] = route
+        if self.limiter.in_process:
+            status = self.limiter.hit(scope, route.path, route_limit)
+        else:
+            status = await to_thread.run_sync(
+                self.limiter.hit, scope, route.path, route_limit
+            )
+
+        if not status.allowed:
+            RATE_LIMIT_REJECTIONS.labels(route.path).inc()
+            await self.reject(send, status)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *status.headers]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    async def reject(send: Send, status: RateLimitStatus) -> None:
+        retry_after = b"%d" % status.reset_after
+        body = b"%s%s}" % (_REJECTION_BODY_HEAD, retry_after)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    *_REJECTION_HEADERS,
+                    (b"content-length", b"%d" % len(body)),
+                    (b"retry-after", retry_after),
+                    *status.headers,
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
 
 
-def rate_limit_exceeded_handler(request: Request, exc):
-    detail: str = getattr(exc, "detail", "")
-    retry_after: int = 60
-
-    match = re.search(r"(\d+)\s+per\s+1\s+(\w+)", detail)
-    if match:
-        _, unit = match.groups()
-        if unit.startswith("second"):
-            retry_after = 1
-        elif unit.startswith("minute"):
-            retry_after = 60
-        elif unit.startswith("hour"):
-            retry_after = 3600
-        elif unit.startswith("day"):
-            retry_after = 86400
-
-    response_body = {
-        "detail": "Rate limit exceeded. Please try again later.",
-        "retry_after_seconds": retry_after,
-    }
-    return JSONResponse(
-        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-        content=response_body,
-        headers={"Retry-After": str(retry_after)},
-    )
+limiter = RateLimiter()
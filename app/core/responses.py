@@ -0,0 +1,18 @@
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+
+class PreEncodedJSONResponse(JSONResponse):
+    """
+    JSON response whose content may already be encoded.
+
+    `bytes` content is sent as is, so bodies serialized once ahead of time
+    (e.g. when the corpus is loaded) cost no encoding per request. Any other
+    content is serialized like a regular `JSONResponse`.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return super().render(content)
@@ -11,3 +11,22 @@ async def not_found_handler(request, exc: NotFound):
     return JSONResponse(
         status_code=status.HTTP_404_NOT_FOUND, content={"detail": str(exc)}
     )
+
+
+class Forbidden(HTTPException):
+    def __init__(self, detail: str = "Forbidden"):
+        super().__init__(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
+
+
+class ServiceUnavailable(HTTPException):
+    def __init__(self, detail: str = "Service Unavailable", retry_after: int = 1):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class NotSupported(HTTPException):
+    def __init__(self, detail: str = "Not Implemented"):
+        super().__init__(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=detail)
@@ -1,50 +1,156 @@
-import sys
+import asyncio
+import importlib
+from contextlib import asynccontextmanager, suppress
+from typing import TYPE_CHECKING
 
-from fastapi import FastAPI
-from fastapi.responses import RedirectResponse
-from slowapi.errors import RateLimitExceeded
+from app.startup import StartupProfile
 
-from app.exceptions import NotFound, not_found_handler
-from app.core import LoggingMiddleware
-from app.core.rate_limiter import limiter, rate_limit_exceeded_handler
-from app.routers import health_router
-from app.quotes.router import router as quote_router
+if TYPE_CHECKING:
+    from fastapi import FastAPI
 
-IS_PROD = "production" if sys.argv[1] == "run" else "development"
+DOCS_SITE = "https://luutanhung.github.io/finance-quote-api/"
 
-if IS_PROD == "production":
-    app = FastAPI(docs_url=None, redoc_url=None, openapi_url=None)
-else:
-    app = FastAPI()
 
-app.state.limiter = limiter
+@asynccontextmanager
+async def lifespan(app: "FastAPI"):
+    """
+    Does the startup work of a worker, once, before it serves requests, and
+    releases its resources on shutdown.
+    """
 
-app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
-app.add_exception_handler(NotFound, not_found_handler)
+    from app.core import configure_access_log
+    from app.core.config import get_settings
+    from app.core.metrics import mark_worker_dead
+    from app.core.rate_limiter import limiter
+    from app.quotes.dependencies import (
+        get_avatar_store,
+        get_card_warmer,
+        get_quote_provider,
+        get_quote_renderer,
+        get_raster_pool,
+        get_render_pool,
+    )
+    from app.quotes.services import load_themes, watch_quotes_file
 
-app.add_middleware(LoggingMiddleware)
+    settings = get_settings()
+    profile: StartupProfile = app.state.startup_profile
 
+    with profile.step("access log"):
+        access_log = configure_access_log() if settings.access_log else None
 
-@app.get("/", include_in_schema=False)
-async def homepage():
-    if IS_PROD:
-        return RedirectResponse("https://luutanhung.github.io/finance-quote-api/")
-    RedirectResponse("/docs")
+    if settings.themes_file:
+        with profile.step("themes"):
+            load_themes(settings.themes_file)
 
+    # Load and index the quote corpus once, before serving any request.
+    with profile.step("quote corpus"):
+        quote_provider = get_quote_provider()
 
-@app.get("/docs", include_in_schema=False)
-async def custom_docs():
-    if IS_PROD:
-        return RedirectResponse("https://luutanhung.github.io/finance-quote-api/")
-    RedirectResponse("/docs")
+    with profile.step("rate limiter"):
+        limiter.setup()
 
+    # Caches and pools are created empty: render threads and rasterization
+    # processes only start with the first card that needs them.
+    with profile.step("renderer"):
+        get_quote_renderer()
 
-@app.get("/docs", include_in_schema=False)
-async def custom_redoc():
-    if IS_PROD:
-        return RedirectResponse("https://luutanhung.github.io/finance-quote-api/")
-    RedirectResponse("/redoc")
+    watcher = None
+    if settings.quotes_reload:
+        watcher = asyncio.create_task(
+            watch_quotes_file(quote_provider, settings.quotes_reload_interval)
+        )
 
+    # Cards are warmed in the background; `/health` reports the progress.
+    warmer = None
+    if settings.warmup:
+        warmer = get_card_warmer()
+        warmer.start()
 
-app.include_router(health_router)
-app.include_router(quote_router)
+    profile.report()
+
+    yield
+
+    if warmer is not None:
+        await warmer.stop()
+    if watcher is not None:
+        watcher.cancel()
+        with suppress(asyncio.CancelledError):
+            await watcher
+    await get_avatar_store().aclose()
+    get_raster_pool().shutdown()
+    get_render_pool().shutdown()
+    mark_worker_dead()
+    if access_log is not None:
+        access_log.stop()
+
+
+def create_app() -> "FastAPI":
+    """
+    Builds the application, configured from the environment (see
+    `Settings`).
+
+    Components are imported here, one step at a time, so that
+    `STARTUP_PROFILE` reports the import time of each; the work done once
+    per worker (loading the corpus, opening the rate-limit storage,
+    creating the caches) is left to `lifespan`. In production
+    (`ENVIRONMENT`), the interactive docs are disabled and `/`, `/docs` and
+    `/redoc` redirect to the documentation site.
+    """
+
+    profile = StartupProfile()
+    with profile.step("import fastapi"):
+        from fastapi import FastAPI
+        from fastapi.responses import RedirectResponse
+
+    with profile.step("import core"):
+        from app.core import AccessLogMiddleware, MetricsMiddleware
+        from app.core.config import PRODUCTION, get_settings
+        from app.core.rate_limiter import RateLimitMiddleware, limiter
+        from app.exceptions import NotFound, not_found_handler
+
+    settings = get_settings()
+    profile.enabled = settings.startup_profile
+
+    with profile.step("import quote services"):
+        importlib.import_module("app.quotes.services")
+
+    with profile.step("import routers"):
+        from app.quotes.router import router as quote_router
+        from app.routers import admin_router, health_router, metrics_router
+
+    with profile.step("build app"):
+        if settings.environment == PRODUCTION:
+            app = FastAPI(
+                docs_url=None, redoc_url=None, openapi_url=None, lifespan=lifespan
+            )
+
+            @app.get("/", include_in_schema=False)
+            @app.get("/docs", include_in_schema=False)
+            @app.get("/redoc", include_in_schema=False)
+            async def documentation():
+                return RedirectResponse(DOCS_SITE)
+
+        else:
+            app = FastAPI(lifespan=lifespan)
+
+            @app.get("/", include_in_schema=False)
+            async def homepage():
+                return RedirectResponse("/docs")
+
+        app.state.startup_profile = profile
+        app.add_exception_handler(NotFound, not_found_handler)
+
+        app.add_middleware(RateLimitMiddleware, limiter=limiter)
+        app.add_middleware(MetricsMiddleware)
+        app.add_middleware(
+            AccessLogMiddleware, sample_rate=settings.access_log_sample_rate
+        )
+
+        app.include_router(health_router)
+        app.include_router(metrics_router)
+        app.include_router(admin_router)
+        app.include_router(quote_router)
+    return app
+
+
+app = create_app()
@@ -0,0 +1,41 @@
+"""
+Compiles a JSON quotes file into a compiled corpus, which the service
+memory-maps instead of parsing and indexing the JSON at every start. Point
+`QUOTES_FILE` at the output to serve it.
+
+The output is written aside and renamed over `output`, so a running service
+can reload it safely. Run with:
+
+    python -m app.quotes.compile_corpus app/quotes/data/quotes.json quotes.qcorpus
+"""
+
+import argparse
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+from .services.corpus import compile_corpus, load_json_quotes
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("source", type=Path, help="the JSON quotes file")
+    parser.add_argument("output", type=Path, help="the compiled corpus to write")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    quotes, version, _ = load_json_quotes(args.source)
+    content = compile_corpus(quotes, version)
+    tmp = args.output.with_name(f".{args.output.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(content)
+    os.replace(tmp, args.output)
+    print(
+        f"Compiled {len(quotes)} quotes (version {version}) into {args.output}:"
+        f" {len(content) / 1e6:.1f} MB in {time.perf_counter() - start:.1f}s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,67 @@
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+# Quotes fetched by ID only change when the corpus is edited.
+BY_ID_CACHE_CONTROL = "public, max-age=86400, stale-while-revalidate=604800"
+# Random quotes must be revalidated on every use.
+RANDOM_CACHE_CONTROL = "no-cache"
+# Seeded quotes only change when the corpus is edited, like quotes by ID.
+SEEDED_CACHE_CONTROL = BY_ID_CACHE_CONTROL
+# Responses that are not worth caching, e.g. an SVG rendered without its avatar.
+NO_CACHE_CONTROL = "no-cache"
+
+# Bump when the SVG output changes for the same quote and parameters, so
+# that ETags of cards rendered by a previous release stop matching.
+SVG_RENDER_VERSION = "2"
+
+
+def make_etag(digest: str, *parts: object) -> str:
+    """
+    Builds a strong ETag from a quote's content digest and the parameters
+    that affect the representation (response type, theme, size...).
+    """
+
+    return '"' + "-".join([digest, *map(str, parts)]) + '"'
+
+
+def http_date(timestamp: float) -> str:
+    return formatdate(timestamp, usegmt=True)
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: Optional[float] = None
+) -> bool:
+    """
+    Evaluates the request's conditional headers against a representation.
+
+    `If-None-Match` takes precedence over `If-Modified-Since`, as required by
+    RFC 9110. Entity tags are compared weakly, which is what the standard
+    mandates for `If-None-Match`.
+
+    Returns:
+        bool: True if the client's cached copy is still valid and a
+              `304 Not Modified` response should be sent.
+    """
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        return any(
+            tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(",")
+        )
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(last_modified) <= since
+    return False
+
+
+def not_modified_response(headers: dict[str, str]) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
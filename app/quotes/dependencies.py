@@ -1,21 +1,210 @@
-from fastapi import Query
+from functools import lru_cache
+from typing import Optional, get_args
 
-from .types import QuoteResponseType, Theme
-from .services import QuoteProvider, SVGConverter
+from fastapi import HTTPException, Query, status
 
+from app.core.cache import LRUCache
+from app.core.compression import Compressor, EncodedBody
+from app.core.config import get_settings
 
+from .types import QuoteResponseType, QuoteType, Theme
+from .services import (
+    THEMES,
+    AvatarDiskCache,
+    AvatarStore,
+    CardWarmer,
+    QuoteProvider,
+    QuoteRenderer,
+    RasterPool,
+    RenderPool,
+    SVGConverter,
+    default_cache_dir,
+)
+
+
+@lru_cache
 def get_quote_provider() -> QuoteProvider:
     """
-    Dependency function to provide a QuoteProvider instance.
+    Dependency function to provide the process-wide QuoteProvider instance.
 
-    This function is responsible for creating and returning a single instance
-    of the `QuoteProvider` class, which manages the quote data.
+    The provider (and the quote corpus it indexes) is created on first use,
+    normally during application startup, and then shared by every request
+    instead of re-reading the quotes file each time.
     """
     return QuoteProvider()
 
 
-def get_svg_converter(
-    theme: Theme = Query(Theme.light, description="Declare theme (light or dark)"),
+@lru_cache
+def get_avatar_store() -> AvatarStore:
+    """
+    Dependency function to provide the process-wide AvatarStore instance.
+
+    Sharing one store lets every SVG render reuse the same HTTP connection
+    pool, in-flight fetches and avatar caches.
+    """
+
+    settings = get_settings()
+    return AvatarStore(
+        max_bytes=settings.avatar_cache_bytes,
+        ttl=settings.avatar_cache_ttl,
+        scale=settings.avatar_scale,
+        disk_cache=AvatarDiskCache(
+            settings.avatar_cache_dir or default_cache_dir(),
+            ttl=settings.avatar_cache_ttl,
+        ),
+    )
+
+
+@lru_cache
+def get_compressor() -> Compressor:
+    """
+    Dependency function to provide the process-wide response Compressor.
+
+    Its cache holds the compressed JSON bodies of quotes, keyed on their
+    content digest, so it needs no invalidation when the quotes change.
+    """
+
+    settings = get_settings()
+    return Compressor(
+        min_size=settings.compression_min_size,
+        cache=LRUCache(max_bytes=settings.json_cache_bytes, name="json"),
+    )
+
+
+@lru_cache
+def get_svg_cache() -> LRUCache[EncodedBody]:
+    """
+    Dependency function to provide the process-wide rendered SVG cache.
+
+    Rendered cards, with their compressed variants, are keyed on
+    `(quote digest, theme, width, height)` and evicted by total size. The
+    cache is cleared whenever the quote corpus is reloaded, to free the
+    cards of the previous quotes.
+    """
+
+    svg_cache: LRUCache[EncodedBody] = LRUCache(
+        max_bytes=get_settings().svg_cache_bytes, name="svg"
+    )
+    get_quote_provider().add_reload_listener(lambda _: svg_cache.clear())
+    return svg_cache
+
+
+@lru_cache
+def get_raster_cache() -> LRUCache[bytes]:
+    """
+    Dependency function to provide the process-wide PNG/WebP image cache.
+
+    Images are keyed on `(quote digest, format, theme, width, height)` and
+    evicted by total size. The cache is cleared whenever the quote corpus
+    is reloaded, to free the images of the previous quotes.
+    """
+
+    raster_cache: LRUCache[bytes] = LRUCache(
+        max_bytes=get_settings().raster_cache_bytes, name="raster"
+    )
+    get_quote_provider().add_reload_listener(lambda _: raster_cache.clear())
+    return raster_cache
+
+
+@lru_cache
+def get_raster_pool() -> RasterPool:
+    """
+    Dependency function to provide the process-wide rasterization pool.
+    """
+
+    settings = get_settings()
+    return RasterPool(
+        max_workers=settings.raster_workers, max_queue=settings.raster_queue
+    )
+
+
+@lru_cache
+def get_render_pool() -> RenderPool:
+    """
+    Dependency function to provide the process-wide SVG render pool.
+    """
+
+    settings = get_settings()
+    return RenderPool(
+        max_workers=settings.render_workers, max_queue=settings.render_queue
+    )
+
+
+@lru_cache
+def get_quote_renderer() -> QuoteRenderer:
+    """
+    Dependency function to provide the process-wide QuoteRenderer instance,
+    wired to the shared avatar store, caches, render and rasterization
+    pools.
+    """
+
+    return QuoteRenderer(
+        avatar_store=get_avatar_store(),
+        svg_cache=get_svg_cache(),
+        raster_cache=get_raster_cache(),
+        raster_pool=get_raster_pool(),
+        render_pool=get_render_pool(),
+        compressor=get_compressor(),
+        avatar_timeout=get_settings().avatar_timeout,
+        quote_digest=get_quote_provider().get_quote_digest,
+    )
+
+
+@lru_cache
+def get_card_warmer() -> CardWarmer:
+    """
+    Dependency function to provide the process-wide CardWarmer instance.
+
+    The warmer pre-renders the configured theme × size matrix, and starts
+    over whenever the quote corpus is reloaded (after the render caches are
+    cleared).
+    """
+
+    settings = get_settings()
+    warmer = CardWarmer(
+        provider=get_quote_provider(),
+        renderer=get_quote_renderer(),
+        themes=settings.warmup_themes,
+        sizes=settings.warmup_sizes,
+        concurrency=settings.warmup_concurrency,
+    )
+    get_quote_provider().add_reload_listener(lambda _: warmer.start())
+    return warmer
+
+
+async def provide_quote_provider() -> QuoteProvider:
+    """
+    Async form of `get_quote_provider` for route dependencies.
+
+    FastAPI runs synchronous dependencies in its threadpool; this one is
+    resolved on the event loop, so the request path never waits for a
+    thread.
+    """
+
+    return get_quote_provider()
+
+
+async def provide_quote_renderer() -> QuoteRenderer:
+    """
+    Async form of `get_quote_renderer` for route dependencies.
+    """
+
+    return get_quote_renderer()
+
+
+async def provide_compressor() -> Compressor:
+    """
+    Async form of `get_compressor` for route dependencies.
+    """
+
+    return get_compressor()
+
+
+async def get_svg_converter(
+    theme: str = Query(
+        Theme.light.value,
+        description="Declare theme (light, dark or a registered custom theme)",
+    ),
     width: int = Query(400, ge=400, le=600, description="Width of SVG"),
     height: int = Query(175, ge=175, le=300, description="Height of SVG"),
 ) -> SVGConverter:
@@ -27,24 +216,62 @@ def get_svg_converter(
     caller to customize the appearance of the generated SVG image.
 
     Args:
-        theme (Theme): The color theme for the SVG (light or dark).
+        theme (str): The color theme for the SVG: `light`, `dark` or a theme
+            registered from `THEMES_FILE`.
         width (int): The width of the SVG image in pixels.
         height (int): The height of the SVG image in pixels.
+
+    Raises:
+        HTTPException: 422 Unprocessable Entity if the theme is unknown.
     """
 
+    if theme not in THEMES:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unknown theme {theme!r}. Available themes: {', '.join(THEMES)}",
+        )
     return SVGConverter(width=width, height=height, theme=theme)
 
 
-def get_quote_response_type(
+async def get_quote_response_type(
     response_type: QuoteResponseType = Query(
-        QuoteResponseType.json, description="Declare response type (json or svg)"
+        QuoteResponseType.json,
+        description="Declare response type (json, svg, png or webp)",
     ),
 ) -> QuoteResponseType:
     """
     Dependency function to determine the response format.
 
-    This function extracts the desired response format (e.g., JSON or SVG)
-    from the request's query parameters and returns it.
+    This function extracts the desired response format (JSON, or an SVG,
+    PNG or WebP image) from the request's query parameters and returns it.
     """
 
     return response_type
+
+
+async def get_type_weights(
+    weights: Optional[str] = Query(
+        None,
+        pattern=r"^\w+:\d+(,\w+:\d+)*$",
+        description="Relative weights of the quote types, e.g. `inspiration:3,practical:1`",
+    ),
+) -> Optional[dict[QuoteType, int]]:
+    """
+    Dependency function to parse weighted quote type selection.
+
+    Raises:
+        HTTPException: 422 Unprocessable Entity if a type is unknown.
+    """
+
+    if not weights:
+        return None
+    parsed: dict[QuoteType, int] = {}
+    for item in weights.split(","):
+        quote_type, weight = item.split(":")
+        if quote_type not in get_args(QuoteType):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Unknown quote type {quote_type!r} in weights",
+            )
+        parsed[quote_type] = int(weight)
+    return parsed
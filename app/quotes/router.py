@@ -1,91 +1,648 @@
-from typing import Optional
+import asyncio
+import itertools
+from datetime import datetime, time, timedelta
+from typing import AsyncIterator, Iterator, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
-from fastapi import APIRouter, Request, Depends, Response, Query
+from fastapi import APIRouter, HTTPException, Request, Depends, Response, Query, status
+from fastapi.responses import StreamingResponse
+from app.core.rate_limiter import (
+    DEFAULT_EXPORT_SIZE,
+    EXPORT_RATE_LIMITS,
+    MAX_EXPORT_SIZE,
+    batch_cost,
+    export_cost,
+    limiter,
+)
+from app.core.compression import Compressor, negotiate
+from app.core.responses import PreEncodedJSONResponse
 
-from .types import QuoteType, QuoteResponseType
-from .schemas import Quote, QuoteRead
+from .conditional import (
+    BY_ID_CACHE_CONTROL,
+    NO_CACHE_CONTROL,
+    RANDOM_CACHE_CONTROL,
+    SEEDED_CACHE_CONTROL,
+    SVG_RENDER_VERSION,
+    http_date,
+    is_not_modified,
+    make_etag,
+    not_modified_response,
+)
+from .types import ExportFormat, QuoteType, QuoteResponseType
+from .schemas import Quote, QuoteRead, QuoteSearchResults
 from .dependencies import (
-    get_quote_provider,
     get_svg_converter,
     get_quote_response_type,
+    get_type_weights,
+    provide_compressor,
+    provide_quote_provider,
+    provide_quote_renderer,
 )
-from .services import QuoteProvider, SVGConverter
+from .services import QuoteProvider, QuoteRenderer, SVGConverter
 
 router = APIRouter(prefix="/api/quotes", tags=["Quote"])
 
+MAX_BATCH_SIZE = 100
+# Quote IDs are 64-bit integers at most.
+MAX_ID_DIGITS = 19
+MAX_SEARCH_PAGE_SIZE = 100
+# Response types sent compressed, when the client accepts it.
+COMPRESSIBLE = (QuoteResponseType.json, QuoteResponseType.svg)
+VARY = "Accept-Encoding"
+# Quotes sent per chunk of an export.
+EXPORT_CHUNK_SIZE = 256
+# An export is streamed, so its schema is documented rather than declared
+# as a response model.
+_QUOTE_SCHEMA = {"$ref": "#/components/schemas/QuoteRead"}
+EXPORT_RESPONSES = {
+    200: {
+        "description": "The quotes, one per line (`ndjson`) or as an array (`json`)",
+        "content": {
+            "application/x-ndjson": {"schema": _QUOTE_SCHEMA},
+            "application/json": {"schema": {"type": "array", "items": _QUOTE_SCHEMA}},
+        },
+    }
+}
+
+
+def cache_headers(
+    quote: Quote,
+    response_type: QuoteResponseType,
+    quote_provider: QuoteProvider,
+    svg_converter: SVGConverter,
+    cache_control: str,
+    last_modified: Optional[float] = None,
+    encoding: Optional[str] = None,
+) -> dict[str, str]:
+    """
+    Builds the caching headers of a quote response.
+
+    The strong ETag is derived from the quote's content digest and, for image
+    responses, from the format and render parameters, so it can be computed before
+    (and without) rendering anything. `Last-Modified` is only sent when
+    `last_modified` is given.
+
+    JSON and SVG responses vary on `Accept-Encoding`: their content coding
+    `encoding` is part of their ETag, so that each variant has its own. It
+    is the coding negotiated (for JSON, unless the body is too small to be
+    compressed), as the body may not be rendered or compressed yet.
+    """
+
+    digest = quote_provider.get_quote_digest(quote)
+    parts = (encoding,) if encoding is not None else ()
+    if response_type != QuoteResponseType.json:
+        etag = make_etag(
+            digest,
+            response_type.value,
+            SVG_RENDER_VERSION,
+            svg_converter.theme,
+            f"{svg_converter.width}x{svg_converter.height}",
+            *parts,
+        )
+    else:
+        etag = make_etag(digest, *parts)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if response_type in COMPRESSIBLE:
+        headers["Vary"] = VARY
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+async def render_card_response(
+    quote: Quote,
+    response_type: QuoteResponseType,
+    svg_converter: SVGConverter,
+    quote_renderer: QuoteRenderer,
+    headers: dict[str, str],
+    encoding: Optional[str] = None,
+) -> Response:
+    """
+    Renders a quote as an SVG, PNG or WebP image response.
+
+    A card that had to be rendered without its avatar is not cacheable by
+    clients, so it is sent without validators. The `X-Cache` header reports
+    whether the card came from the render cache. SVG cards are sent in
+    `encoding` when the renderer kept a variant in that coding.
+    """
+
+    card = await quote_renderer.render(quote, response_type, svg_converter)
+    if not card.complete:
+        headers = {
+            "Cache-Control": NO_CACHE_CONTROL,
+            **{k: v for k, v in headers.items() if k == "Vary"},
+        }
+    headers = {**headers, "X-Cache": "HIT" if card.cache_hit else "MISS"}
+    content = card.content
+    if encoding in card.variants:
+        content = card.variants[encoding]
+        headers["Content-Encoding"] = encoding
+    return Response(content=content, media_type=card.media_type, headers=headers)
+
+
+def json_response(
+    request: Request, body: bytes, compressor: Compressor
+) -> PreEncodedJSONResponse:
+    """
+    Sends a pre-encoded JSON body built for this request (e.g. a batch), in
+    the content coding negotiated from `Accept-Encoding`.
+    """
+
+    encoding = negotiate(request.headers.get("accept-encoding"))
+    body, applied = compressor.compress_once(body, encoding)
+    headers = {"Vary": VARY}
+    if applied is not None:
+        headers["Content-Encoding"] = applied
+    return PreEncodedJSONResponse(body, headers=headers)
+
+
+async def quote_response(
+    request: Request,
+    quote: Quote,
+    response_type: QuoteResponseType,
+    quote_provider: QuoteProvider,
+    svg_converter: SVGConverter,
+    quote_renderer: QuoteRenderer,
+    compressor: Compressor,
+    cache_control: str,
+    last_modified: Optional[float] = None,
+    expires: Optional[float] = None,
+):
+    """
+    Builds the response of a single-quote endpoint.
+
+    Caching headers are computed first, so that a matching conditional
+    request is answered with `304 Not Modified` before any serialization or
+    rendering. `Expires` is set when `expires` is given. JSON bodies are
+    sent pre-encoded, as kept by the corpus.
+
+    JSON and SVG bodies are sent in the content coding negotiated from
+    `Accept-Encoding`, from variants compressed once and cached. For JSON,
+    the coding in the ETag is decided from the body size alone, so a `304`
+    costs no compression.
+    """
+
+    encoding = body = None
+    if response_type in COMPRESSIBLE:
+        encoding = negotiate(request.headers.get("accept-encoding"))
+    if response_type == QuoteResponseType.json:
+        body = quote_provider.get_quote_json(quote)
+        encoding = compressor.coding_for(body, encoding)
+    headers = cache_headers(
+        quote,
+        response_type,
+        quote_provider,
+        svg_converter,
+        cache_control,
+        last_modified,
+        encoding,
+    )
+    if expires is not None:
+        headers["Expires"] = http_date(expires)
+    if is_not_modified(request, headers["ETag"], last_modified):
+        return not_modified_response(headers)
+    if response_type != QuoteResponseType.json:
+        return await render_card_response(
+            quote, response_type, svg_converter, quote_renderer, headers, encoding
+        )
+    if encoding is not None:
+        body, applied = compressor.encode_cached(
+            quote_provider.get_quote_digest(quote), body
+        ).select(encoding)
+        if applied is not None:
+            headers["Content-Encoding"] = applied
+    return PreEncodedJSONResponse(body, headers=headers)
+
+
+@router.get("", response_model=list[QuoteRead])
+@limiter.limit(cost=batch_cost)
+async def get_quotes(
+    request: Request,
+    ids: Optional[str] = Query(
+        None,
+        pattern=rf"^\d{{1,{MAX_ID_DIGITS}}}(,\d{{1,{MAX_ID_DIGITS}}})*$",
+        max_length=MAX_BATCH_SIZE * (MAX_ID_DIGITS + 1) - 1,
+        description="Comma-separated IDs of the quotes to retrieve, e.g. `1,5,9`",
+    ),
+    count: Optional[int] = Query(
+        None,
+        ge=1,
+        le=MAX_BATCH_SIZE,
+        description="Number of distinct random quotes to retrieve, when `ids` is omitted",
+    ),
+    quote_type: Optional[QuoteType] = Query(
+        None, description="Declare type of the random quotes"
+    ),
+    quote_provider: QuoteProvider = Depends(provide_quote_provider),
+    compressor: Compressor = Depends(provide_compressor),
+):
+    """
+    Retrieves several quotes in one call.
+
+    Pass either `ids` to fetch specific quotes, in the order given, or
+    `count` to get that many distinct random quotes, optionally filtered by
+    `quote_type`. The whole batch counts against the rate limits as a
+    single call weighted by its size.
+
+    Args:
+        ids (Optional[str]): Comma-separated quote IDs, of at most 19
+            digits. Unknown IDs are skipped.
+        count (Optional[int]): Number of random quotes, at most 100.
+        quote_type (Optional[QuoteType]): The type of the random quotes.
+        quote_provider (QuoteProvider): Dependency to get the quote data.
+        compressor (Compressor): Dependency compressing the response body.
+
+    Returns:
+        Response: A JSON array of quotes.
+
+    Raises:
+        HTTPException: 422 Unprocessable Entity if neither `ids` nor `count`
+                       is given, or if more than 100 IDs are requested.
+        HTTPException: 404 Not Found if no quotes of the specified type exist.
+    """
+
+    if ids:
+        parts = ids.split(",")
+        if len(parts) > MAX_BATCH_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"At most {MAX_BATCH_SIZE} ids can be requested at once",
+            )
+        quotes = quote_provider.get_quotes_by_ids([int(id) for id in parts])
+    elif count:
+        quotes = quote_provider.get_random_quotes(count, quote_type)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Either ids or count is required",
+        )
+    return json_response(request, quote_provider.get_quotes_json(quotes), compressor)
+
+
+@router.get("/search", response_model=QuoteSearchResults)
+@limiter.limit()
+async def search_quotes(
+    request: Request,
+    q: Optional[str] = Query(
+        None,
+        max_length=256,
+        description="Words to search for in the quotes and their authors; the last one also matches as a prefix and needs at least 2 characters",
+    ),
+    author: Optional[str] = Query(
+        None, max_length=128, description="Words of the author name"
+    ),
+    quote_type: Optional[QuoteType] = Query(
+        None, alias="type", description="Declare type of quote"
+    ),
+    cursor: Optional[str] = Query(
+        None, max_length=128, description="`next_cursor` of the previous page"
+    ),
+    limit: int = Query(
+        20, ge=1, le=MAX_SEARCH_PAGE_SIZE, description="Number of quotes per page"
+    ),
+    quote_provider: QuoteProvider = Depends(provide_quote_provider),
+    compressor: Compressor = Depends(provide_compressor),
+):
+    """
+    Searches the quotes.
+
+    Returns the quotes matching every word of `q` (in the quote text or
+    its author's name), every word of `author` and the `type`. Results are
+    not scored against the query: they always come shortest quote first.
+    The last word of `q` also matches as a prefix, so `sav` finds `saving`;
+    it needs at least 2 characters. Matching ignores case and accents.
+    Results are paginated: pass the `next_cursor` of a page as `cursor` to
+    get the next one.
+
+    Args:
+        q (Optional[str]): Words to search for.
+        author (Optional[str]): Words of the author name.
+        quote_type (Optional[QuoteType]): The type of the quotes.
+        cursor (Optional[str]): The cursor of the page to retrieve.
+        limit (int): Number of quotes per page, at most 100.
+        quote_provider (QuoteProvider): Dependency to get the quote data.
+        compressor (Compressor): Dependency compressing the response body.
+
+    Returns:
+        Response: A JSON object with the page of quotes as `results` and
+                  the cursor of the next page as `next_cursor` (null on
+                  the last page).
+
+    Raises:
+        HTTPException: 422 Unprocessable Entity if no criterion is given,
+                       if the last word of `q` has a single character, or
+                       if the cursor is invalid or was issued before the
+                       quotes were reloaded.
+    """
+
+    if not (q or author or quote_type):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="At least one of q, author or type is required",
+        )
+    try:
+        quotes, next_cursor = quote_provider.search_quotes(
+            q, author, quote_type, cursor, limit
+        )
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)
+        )
+    body = b'{"results":%s,"next_cursor":%s}' % (
+        quote_provider.get_quotes_json(quotes),
+        b"null" if next_cursor is None else b'"%s"' % next_cursor.encode(),
+    )
+    return json_response(request, body, compressor)
+
+
+async def export_chunks(
+    bodies: Iterator[bytes], export_format: ExportFormat
+) -> AsyncIterator[bytes]:
+    """
+    Frames pre-encoded quote bodies as NDJSON lines or as a JSON array,
+    `EXPORT_CHUNK_SIZE` quotes per chunk.
+
+    A chunk is only read from the corpus once the previous one was sent,
+    so memory does not grow with the export and a slow client slows the
+    export down. The event loop is yielded to between chunks, so other
+    requests are served while an export streams.
+    """
+
+    ndjson = export_format == ExportFormat.ndjson
+    first = True
+    while chunk := list(itertools.islice(bodies, EXPORT_CHUNK_SIZE)):
+        if ndjson:
+            yield b"\n".join(chunk) + b"\n"
+        else:
+            yield (b"[" if first else b",") + b",".join(chunk)
+        first = False
+        await asyncio.sleep(0)
+    if not ndjson:
+        yield b"[]" if first else b"]"
+
+
+@router.get("/export", response_class=StreamingResponse, responses=EXPORT_RESPONSES)
+@limiter.limit(EXPORT_RATE_LIMITS, cost=export_cost)
+async def export_quotes(
+    request: Request,
+    export_format: ExportFormat = Query(
+        ExportFormat.ndjson,
+        alias="format",
+        description="`ndjson` (one quote per line) or `json` (an array)",
+    ),
+    quote_type: Optional[QuoteType] = Query(
+        None, alias="type", description="Declare type of quote"
+    ),
+    after: Optional[int] = Query(
+        None, description="ID of the last quote received; the export resumes after it"
+    ),
+    limit: int = Query(
+        DEFAULT_EXPORT_SIZE,
+        ge=1,
+        le=MAX_EXPORT_SIZE,
+        description="Maximum number of quotes exported",
+    ),
+    quote_provider: QuoteProvider = Depends(provide_quote_provider),
+):
+    """
+    Streams the quotes, by ascending ID.
+
+    Exports up to `limit` quotes, optionally of one `type`, as NDJSON or as
+    a JSON array. Quote IDs are stable, so the ID of the last quote
+    received is the cursor of the next page, or of the rest of an
+    interrupted export: pass it as `after`. The export is complete when
+    fewer than `limit` quotes are returned. An export counts against its
+    own rate limits, weighted by its `limit`.
+
+    Args:
+        export_format (ExportFormat): `ndjson` (the default) or `json`.
+        quote_type (Optional[QuoteType]): The type of the quotes.
+        after (Optional[int]): Only quotes with a greater ID are exported.
+        limit (int): Number of quotes, at most 100,000.
+        quote_provider (QuoteProvider): Dependency to get the quote data.
+
+    Returns:
+        StreamingResponse: The quotes, as `application/x-ndjson` or
+                           `application/json`.
+    """
+
+    bodies = quote_provider.export_quotes(quote_type, after, limit)
+    return StreamingResponse(
+        export_chunks(bodies, export_format),
+        media_type="application/x-ndjson"
+        if export_format == ExportFormat.ndjson
+        else "application/json",
+        headers={"Cache-Control": NO_CACHE_CONTROL},
+    )
+
 
 @router.get("/random")
-def get_random_quote(
+@limiter.limit()
+async def get_random_quote(
     request: Request,
     quote_type: Optional[QuoteType] = Query(None, description="Declare type of quote"),
+    seed: Optional[str] = Query(
+        None,
+        max_length=256,
+        description="Makes the selection deterministic: a seed always maps to the same quote",
+    ),
+    author: Optional[str] = Query(
+        None, max_length=128, description="Words of the author name"
+    ),
+    weights: Optional[dict[QuoteType, int]] = Depends(get_type_weights),
     response_type: QuoteResponseType = Depends(get_quote_response_type),
-    quote_provider: QuoteProvider = Depends(get_quote_provider),
+    quote_provider: QuoteProvider = Depends(provide_quote_provider),
     svg_converter: SVGConverter = Depends(get_svg_converter),
+    quote_renderer: QuoteRenderer = Depends(provide_quote_renderer),
+    compressor: Compressor = Depends(provide_compressor),
 ):
     """
     Retrieves a random quote.
 
     This endpoint returns a random quote from the collection. You can
     optionally filter the quote by its `type` using the `quote_type` query
-    parameter. The response can be either a JSON object or an SVG image,
-    controlled by the `response_type` parameter.
+    parameter, or draw the type with relative `weights`, and restrict it to
+    an `author`. With a `seed`, the
+    same quote is returned every time (as long as the collection does not
+    change), so the response is cacheable. The response can be either a
+    JSON object or an SVG, PNG or WebP image, controlled by the
+    `response_type` parameter.
 
     Args:
         quote_type (Optional[QuoteType]): The type of quote to retrieve.
             For example, `programming`, `philosophy`, or `humor`.
+        seed (Optional[str]): Makes the selection deterministic.
+        author (Optional[str]): Words of the author name, e.g. `franklin`.
+        weights (Optional[dict[QuoteType, int]]): Relative weights of the
+            quote types, e.g. `inspiration:3,practical:1`.
+        response_type (QuoteResponseType): The desired format of the response.
+            Defaults to JSON. Use `svg`, `png` or `webp` to get an image.
+        quote_provider (QuoteProvider): Dependency to get the quote data.
+        svg_converter (SVGConverter): Dependency holding the image theme and
+            size.
+        quote_renderer (QuoteRenderer): Dependency to render the quote as an
+            image, with caching.
+        compressor (Compressor): Dependency compressing the response body.
+
+    Returns:
+        Union[QuoteRead, Response]: A QuoteRead Pydantic model in JSON format,
+                                    or a FastAPI Response with an image.
+                                    `304 Not Modified` is returned instead when
+                                    the client's `If-None-Match` (or
+                                    `If-Modified-Since`) validator matches.
+
+    Raises:
+        HTTPException: 404 Not Found if no quotes of the specified type (and
+                       author) exist.
+        HTTPException: 503 Service Unavailable (with `Retry-After`) if PNG or
+                       WebP rendering is saturated.
+    """
+
+    quote: Quote = quote_provider.get_random_quote(quote_type, seed, weights, author)
+    if seed is None:
+        cache_control, last_modified = RANDOM_CACHE_CONTROL, None
+    else:
+        cache_control, last_modified = (
+            SEEDED_CACHE_CONTROL,
+            quote_provider.last_modified,
+        )
+    return await quote_response(
+        request,
+        quote,
+        response_type,
+        quote_provider,
+        svg_converter,
+        quote_renderer,
+        compressor,
+        cache_control,
+        last_modified,
+    )
+
+
+@router.get("/daily", response_model=QuoteRead)
+@limiter.limit()
+async def get_daily_quote(
+    request: Request,
+    tz: str = Query(
+        "UTC", description="IANA time zone the day starts in, e.g. `Europe/Paris`"
+    ),
+    quote_type: Optional[QuoteType] = Query(None, description="Declare type of quote"),
+    weights: Optional[dict[QuoteType, int]] = Depends(get_type_weights),
+    response_type: QuoteResponseType = Depends(get_quote_response_type),
+    quote_provider: QuoteProvider = Depends(provide_quote_provider),
+    svg_converter: SVGConverter = Depends(get_svg_converter),
+    quote_renderer: QuoteRenderer = Depends(provide_quote_renderer),
+    compressor: Compressor = Depends(provide_compressor),
+):
+    """
+    Retrieves the quote of the day.
+
+    Every client asking on the same day, in the same time zone and with the
+    same filters, gets the same quote. The response is cacheable until the
+    next midnight in `tz`, which is also sent as the `Expires` header.
+
+    Args:
+        tz (str): The IANA time zone the day is computed in.
+        quote_type (Optional[QuoteType]): The type of quote to retrieve.
+        weights (Optional[dict[QuoteType, int]]): Relative weights of the
+            quote types, e.g. `inspiration:3,practical:1`.
         response_type (QuoteResponseType): The desired format of the response.
-            Defaults to JSON. Use `svg` to get an SVG image.
+            Defaults to JSON. Use `svg`, `png` or `webp` to get an image.
         quote_provider (QuoteProvider): Dependency to get the quote data.
-        svg_converter (SVGConverter): Dependency to convert the quote to SVG.
+        svg_converter (SVGConverter): Dependency holding the image theme and
+            size.
+        quote_renderer (QuoteRenderer): Dependency to render the quote as an
+            image, with caching.
+        compressor (Compressor): Dependency compressing the response body.
 
     Returns:
         Union[QuoteRead, Response]: A QuoteRead Pydantic model in JSON format,
-                                    or a FastAPI Response with an SVG image.
+                                    or a FastAPI Response with an image.
 
     Raises:
+        HTTPException: 422 Unprocessable Entity if the time zone is unknown.
         HTTPException: 404 Not Found if no quotes of the specified type exist.
     """
 
-    quote: Quote = quote_provider.get_random_quote(quote_type)
-    if response_type == QuoteResponseType.svg:
-        quote_svg: str = svg_converter.convert_to_svg(quote)
-        return Response(content=quote_svg, media_type="image/svg+xml")
-    return QuoteRead(**quote.model_dump())
+    try:
+        zone = ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unknown time zone {tz!r}",
+        )
+    today = datetime.now(zone).date()
+    next_day = datetime.combine(today + timedelta(days=1), time(), tzinfo=zone)
+    max_age = max(0, int(next_day.timestamp() - datetime.now().timestamp()))
+
+    quote: Quote = quote_provider.get_random_quote(
+        quote_type, f"daily:{today.isoformat()}", weights
+    )
+    return await quote_response(
+        request,
+        quote,
+        response_type,
+        quote_provider,
+        svg_converter,
+        quote_renderer,
+        compressor,
+        f"public, max-age={max_age}",
+        expires=next_day.timestamp(),
+    )
 
 
 @router.get("/{id}", response_model=QuoteRead)
-def get_quote_by_id(
+@limiter.limit()
+async def get_quote_by_id(
     request: Request,
     id: int,
     response_type: QuoteResponseType = Depends(get_quote_response_type),
-    quote_provider: QuoteProvider = Depends(get_quote_provider),
+    quote_provider: QuoteProvider = Depends(provide_quote_provider),
     svg_converter: SVGConverter = Depends(get_svg_converter),
+    quote_renderer: QuoteRenderer = Depends(provide_quote_renderer),
+    compressor: Compressor = Depends(provide_compressor),
 ):
     """
     Retrieves a quote by its unique ID.
 
     This endpoint fetches a specific quote using its integer ID. The response
-    can be either a JSON object or an SVG image, depending on the
-    `response_type` parameter.
+    can be either a JSON object or an SVG, PNG or WebP image, depending on
+    the `response_type` parameter.
 
     Args:
         id (int): The unique integer ID of the quote.
         response_type (QuoteResponseType): The desired format of the response.
-            Defaults to JSON. Use `svg` to get an SVG image.
+            Defaults to JSON. Use `svg`, `png` or `webp` to get an image.
         quote_provider (QuoteProvider): Dependency to get the quote data.
-        svg_converter (SVGConverter): Dependency to convert the quote to SVG.
+        svg_converter (SVGConverter): Dependency holding the image theme and
+            size.
+        quote_renderer (QuoteRenderer): Dependency to render the quote as an
+            image, with caching.
+        compressor (Compressor): Dependency compressing the response body.
 
     Returns:
         Union[QuoteRead, Response]: A QuoteRead Pydantic model in JSON format,
-                                    or a FastAPI Response with an SVG image.
+                                    or a FastAPI Response with an image.
+                                    `304 Not Modified` is returned instead when
+                                    the client's `If-None-Match` (or
+                                    `If-Modified-Since`) validator matches.
 
     Raises:
         HTTPException: 404 Not Found if the quote with the specified ID does
                        not exist.
+        HTTPException: 503 Service Unavailable (with `Retry-After`) if PNG or
+                       WebP rendering is saturated.
     """
 
     quote: Quote = quote_provider.get_quote_by_id(id)
-    if response_type == QuoteResponseType.svg:
-        quote_svg: str = svg_converter.convert_to_svg(quote)
-        return Response(content=quote_svg, media_type="image/svg+xml")
-    return QuoteRead(**quote.model_dump())
+    return await quote_response(
+        request,
+        quote,
+        response_type,
+        quote_provider,
+        svg_converter,
+        quote_renderer,
+        compressor,
+        BY_ID_CACHE_CONTROL,
+        quote_provider.last_modified,
+    )
@@ -15,3 +15,8 @@ class Quote(BaseModel):
 
 class QuoteRead(Quote):
     pass
+
+
+class QuoteSearchResults(BaseModel):
+    results: list[QuoteRead]
+    next_cursor: Optional[str] = None
@@ -1,4 +1,30 @@
+from .avatar_processing import AvatarDiskCache, default_cache_dir
+from .avatar_store import AvatarStore
+from .corpus import QuoteCorpus
+from .corpus_watcher import watch_quotes_file
 from .quote_provider import QuoteProvider
+from .rasterizer import RasterPool
+from .render_pool import RenderPool
+from .renderer import QuoteRenderer, RenderedCard
 from .svg_converter import SVGConverter
+from .themes import THEMES, ThemePalette, load_themes, register_theme
+from .warmup import CardWarmer
 
-__all__ = ["QuoteProvider", "SVGConverter"]
+__all__ = [
+    "AvatarDiskCache",
+    "AvatarStore",
+    "CardWarmer",
+    "QuoteCorpus",
+    "QuoteProvider",
+    "QuoteRenderer",
+    "RasterPool",
+    "RenderPool",
+    "RenderedCard",
+    "SVGConverter",
+    "THEMES",
+    "ThemePalette",
+    "load_themes",
+    "register_theme",
+    "default_cache_dir",
+    "watch_quotes_file",
+]
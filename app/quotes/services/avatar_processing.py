@@ -0,0 +1,127 @@
+import base64
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import time
+from functools import cache
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger("uvicorn.error")
+
+# Diameter of the avatar on a card, in CSS pixels (`SVGConverter.render`).
+AVATAR_SIZE = 72
+# Bumped whenever processing changes, so stale files on disk are not used.
+PROCESSING_VERSION = "1"
+# Types of the avatars embedded unprocessed (without Pillow); any other
+# `Content-Type` is replaced, so it never reaches the SVG as is.
+EMBEDDABLE_TYPES = frozenset(
+    ("image/png", "image/jpeg", "image/gif", "image/webp", "image/avif")
+)
+
+
+def default_cache_dir() -> Path:
+    return Path(tempfile.gettempdir()) / "finance-quote-api" / "avatars"
+
+
+@cache
+def output_format() -> Optional[str]:
+    """
+    Returns the format processed avatars are encoded in: WebP when Pillow
+    supports it, else JPEG, or None when Pillow is not installed.
+    """
+
+    try:
+        from PIL import features
+    except ImportError:
+        return None
+    return "WEBP" if features.check("webp") else "JPEG"
+
+
+def data_uri(content: bytes, mime_type: str) -> str:
+    return f"data:{mime_type};base64,{base64.b64encode(content).decode('ascii')}"
+
+
+def process_avatar(content: bytes, sizes: tuple[int, ...]) -> Optional[list[str]]:
+    """
+    Center-crops an avatar to a square and resizes it to each of `sizes`
+    pixels, re-encoded as WebP (or JPEG).
+
+    Requires the optional `Pillow` package.
+
+    Returns:
+        Optional[list[str]]: One `data:` URI per size, or None if Pillow is
+        not installed.
+
+    Raises:
+        ValueError: If `content` is not an image Pillow can process, e.g.
+            a corrupt file or a decompression bomb.
+    """
+
+    image_format = output_format()
+    if image_format is None:
+        return None
+
+    from PIL import Image, ImageOps
+
+    # Pillow raises many error types (decoder errors, DecompressionBombError,
+    # ...), all of which mean the same here: the image cannot be used.
+    try:
+        image = Image.open(io.BytesIO(content))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+        alpha = image_format == "WEBP" and image.mode in ("RGBA", "LA", "P")
+        image = image.convert("RGBA" if alpha else "RGB")
+
+        uris = []
+        for size in sizes:
+            output = io.BytesIO()
+            resized = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+            resized.save(output, format=image_format, quality=80)
+            uris.append(data_uri(output.getvalue(), f"image/{image_format.lower()}"))
+    except Exception as exc:
+        raise ValueError(f"Unprocessable image: {exc!r}") from exc
+    return uris
+
+
+class AvatarDiskCache:
+    """
+    Processed avatars stored as files, so they survive restarts and are
+    shared by the workers of a host.
+
+    Each entry is one file holding a `data:` URI, named after a digest of
+    its key. Entries older than `ttl` are ignored and overwritten.
+    """
+
+    def __init__(self, directory: Path, ttl: float) -> None:
+        self.directory = directory
+        self.ttl = ttl
+
+    def _path(self, key: str) -> Path:
+        name = hashlib.blake2b(
+            f"{PROCESSING_VERSION}\x1f{key}".encode("utf-8"), digest_size=16
+        ).hexdigest()
+        return self.directory / name[:2] / name
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            if os.stat(path).st_mtime + self.ttl < time.time():
+                return None
+            return path.read_text(encoding="ascii")
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Written aside and renamed, so readers never see a partial file.
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(value, encoding="ascii")
+            os.replace(tmp, path)
+        except OSError as exc:
+            logger.warning(f"Failed to write avatar cache {path}: {exc!r}")
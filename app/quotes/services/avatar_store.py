@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Optional
+
+from anyio import to_thread
+
+from app.core.cache import LRUCache
+from app.core.metrics import AVATAR_FETCH_DURATION
+
+from .avatar_processing import (
+    AVATAR_SIZE,
+    EMBEDDABLE_TYPES,
+    AvatarDiskCache,
+    data_uri,
+    process_avatar,
+)
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class AvatarStore:
+    """
+    Fetches author avatars and caches them as base64 `data:` URIs.
+
+    - Fetches are asynchronous and share one pooled `httpx.AsyncClient`.
+    - Concurrent requests for the same URL are coalesced into one upstream
+      fetch.
+    - Fetched images are center-cropped and downscaled to the size they
+      are displayed at, at 1× and 2×, and re-encoded as WebP (or JPEG),
+      off the event loop. The variant of `scale` is embedded in the cards.
+      Without Pillow, the original bytes are embedded instead.
+    - Processed variants are kept in `disk_cache`, so each avatar is
+      processed once per host, across restarts and workers.
+    - Results are kept in an LRU cache bounded by a byte budget and a TTL.
+      Failed fetches, and images that cannot be processed, are cached as
+      missing for a shorter `negative_ttl`, so a broken avatar is not
+      fetched again on every render.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 16 * 1024 * 1024,
+        ttl: float = 24 * 3600,
+        negative_ttl: float = 60,
+        fetch_timeout: float = 5,
+        max_connections: int = 20,
+        scale: int = 2,
+        disk_cache: Optional[AvatarDiskCache] = None,
+    ) -> None:
+        self.cache: LRUCache[str] = LRUCache(
+            max_bytes=max_bytes, ttl=ttl, name="avatar"
+        )
+        self.negative_ttl = negative_ttl
+        self.fetch_timeout = fetch_timeout
+        self.max_connections = max_connections
+        self.scale = scale
+        self.disk_cache = disk_cache
+        self.fetches = 0
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._inflight: dict[str, asyncio.Future[str]] = {}
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        if self._client is None:
+            # httpx is imported with the first fetch, which keeps it (and its
+            # TLS setup) out of the startup of workers.
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                timeout=self.fetch_timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._client
+
+    async def get(self, url: str, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Returns the avatar at `url` as a `data:` URI.
+
+        Args:
+            url (str): The avatar URL.
+            timeout (Optional[float]): How long to wait for an uncached
+                avatar, in seconds. On timeout the fetch keeps running in the
+                background to fill the cache, and None is returned so the
+                caller can render without the avatar.
+
+        Returns:
+            Optional[str]: The data URI, or None if the avatar is unavailable.
+        """
+
+        cached = self.cache.get(url)
+        if cached is not None:
+            return cached or None
+
+        fetch = self._inflight.get(url)
+        if fetch is None:
+            fetch = asyncio.ensure_future(self._fetch(url))
+            self._inflight[url] = fetch
+            fetch.add_done_callback(lambda _: self._inflight.pop(url, None))
+
+        try:
+            data_uri = await asyncio.wait_for(asyncio.shield(fetch), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return data_uri or None
+
+    async def _fetch(self, url: str) -> str:
+        if self.disk_cache is not None:
+            cached = await to_thread.run_sync(
+                self.disk_cache.get, self._variant_key(url, self.scale)
+            )
+            if cached:
+                self.cache.set(url, cached)
+                return cached
+
+        self.fetches += 1
+        start = time.perf_counter()
+        try:
+            resp = await self.client.get(url)
+            resp.raise_for_status()
+        except Exception as exc:
+            # Not only HTTP errors: e.g. a malformed URL raises InvalidURL,
+            # and should leave the card without its avatar all the same.
+            AVATAR_FETCH_DURATION.labels("error").observe(time.perf_counter() - start)
+            logger.warning(f"Failed to fetch avatar {url}: {exc!r}")
+            self.cache.set(url, "", ttl=self.negative_ttl)
+            return ""
+
+        AVATAR_FETCH_DURATION.labels("ok").observe(time.perf_counter() - start)
+        mime_type = resp.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        try:
+            avatar = await to_thread.run_sync(
+                self._process, url, resp.content, mime_type
+            )
+        except Exception as exc:
+            logger.warning(f"Failed to process avatar {url}: {exc!r}")
+            self.cache.set(url, "", ttl=self.negative_ttl)
+            return ""
+        self.cache.set(url, avatar)
+        return avatar
+
+    @staticmethod
+    def _variant_key(url: str, scale: int) -> str:
+        return f"{url}@{scale}x"
+
+    def _process(self, url: str, content: bytes, mime_type: str) -> str:
+        """
+        Returns the avatar to embed, storing every processed variant in the
+        disk cache. Runs in a worker thread.
+        """
+
+        variants = process_avatar(content, (AVATAR_SIZE, 2 * AVATAR_SIZE))
+        if variants is None:
+            if mime_type not in EMBEDDABLE_TYPES:
+                mime_type = "image/png"
+            return data_uri(content, mime_type)
+        if self.disk_cache is not None:
+            for scale, variant in enumerate(variants, start=1):
+                self.disk_cache.set(self._variant_key(url, scale), variant)
+        return variants[min(self.scale, len(variants)) - 1]
+
+    async def aclose(self) -> None:
+        """
+        Closes the pooled HTTP client. A new one is created on next use.
+        """
+
+        for fetch in list(self._inflight.values()):
+            fetch.cancel()
+        self._inflight.clear()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,368 @@
+import hashlib
+import json
+import os
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Iterator, Optional, Sequence, Union
+
+from pydantic import TypeAdapter
+
+from ..types import QuoteType
+from ..schemas import Quote
+from .corpus_file import CorpusFile, is_corpus_file, string_table, write_corpus_file
+from .search_index import QUOTE_TYPES, SearchIndex, index_sections
+
+_QUOTE_LIST_ADAPTER = TypeAdapter(list[Quote])
+
+# Number of Quote models kept per corpus; the others are rebuilt from their
+# pre-encoded body when served again.
+MODEL_CACHE_SIZE = 65536
+
+
+def encode_quote(quote: Quote) -> bytes:
+    """
+    Returns the JSON body a quote is served as, byte-identical to what
+    FastAPI's `QuoteRead` response model would produce.
+    """
+
+    return quote.model_dump_json().encode("utf-8")
+
+
+def _digest(encoded: bytes) -> str:
+    return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+
+def quote_digest(quote: Quote) -> str:
+    """
+    Returns a short digest of everything a quote serializes to, suitable as
+    the basis of a strong HTTP ETag.
+    """
+
+    return _digest(encode_quote(quote))
+
+
+def content_id(raw: dict[str, Any]) -> int:
+    """
+    Derives a stable quote ID from the quote's text and author.
+
+    Used for entries that do not declare an explicit `id`, so that the ID of
+    a quote does not depend on its position in the file and survives reloads.
+    The result is a positive 48-bit integer, safe for JSON clients.
+    """
+
+    key = f"{raw.get('quote', '').strip()}\x1f{(raw.get('author') or '').strip()}"
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=6).digest()
+    return int.from_bytes(digest, "big") or 1
+
+
+def load_json_quotes(file_path: Union[str, Path]) -> tuple[list[Quote], str, float]:
+    """
+    Loads and validates the quotes of a JSON file.
+
+    Quotes keep the `id` declared in the file; entries without one get a
+    content-derived ID (see `content_id`). The whole list is validated in
+    one pass.
+
+    Raises:
+        ValueError: If the file is not a valid quote collection.
+
+    Returns:
+        tuple[list[Quote], str, float]: The quotes, a digest of the file
+        content (the corpus version) and the file's modification time.
+    """
+
+    with open(file_path, "rb") as f:
+        raw = f.read()
+        last_modified = os.fstat(f.fileno()).st_mtime
+    data = json.loads(raw)
+    if not isinstance(data, list) or not all(isinstance(q, dict) for q in data):
+        raise ValueError("A quotes file must hold a JSON list of objects")
+    for q in data:
+        if q.get("id") is None:
+            q["id"] = content_id(q)
+    version = hashlib.blake2b(raw, digest_size=8).hexdigest()
+    return _QUOTE_LIST_ADAPTER.validate_python(data), version, last_modified
+
+
+def compile_corpus(quotes: Sequence[Quote], version: str = "") -> bytes:
+    """
+    Compiles quotes into the columnar format a `QuoteCorpus` is read from.
+
+    Every column is an array indexed by the position of the quote in
+    `quotes`, or a string table with an offset array:
+    - `ids`: the quote IDs, with `sorted_ids` and their `id_positions` to
+      look quotes up by ID.
+    - `types`: the type code of each quote (an index in `QUOTE_TYPES`), and
+      `type_ids`, the IDs grouped by type, delimited by `type_offsets`.
+    - `bodies`: the pre-encoded JSON body of each quote (`encode_quote`).
+      Quote models are built from it, when served.
+    - `digests`: the 8-byte digest of each body (`quote_digest`).
+    - the sections of the search index (`index_sections`).
+
+    Raises:
+        ValueError: If two quotes have the same ID.
+
+    Returns:
+        bytes: The content of a compiled corpus file (see `CorpusFile`).
+    """
+
+    ids = array("q", (q.id for q in quotes))
+    id_positions = array("I", sorted(range(len(ids)), key=ids.__getitem__))
+    sorted_ids = array("q", (ids[i] for i in id_positions))
+    for previous, current in zip(sorted_ids, sorted_ids[1:]):
+        if previous == current:
+            raise ValueError(f"Duplicate quote id: {current}")
+
+    types = array("B", (QUOTE_TYPES.index(q.type) for q in quotes))
+    type_ids = array("q")
+    type_offsets = array("Q", [0])
+    for code in range(len(QUOTE_TYPES)):
+        type_ids.extend(id for id, t in zip(ids, types) if t == code)
+        type_offsets.append(len(type_ids))
+
+    encoded = [encode_quote(q) for q in quotes]
+    bodies, body_offsets = string_table(encoded)
+    digests = b"".join(hashlib.blake2b(e, digest_size=8).digest() for e in encoded)
+    del encoded
+
+    return write_corpus_file(
+        {"version": version, "count": len(quotes), "types": list(QUOTE_TYPES)},
+        {
+            "ids": ids,
+            "sorted_ids": sorted_ids,
+            "id_positions": id_positions,
+            "types": types,
+            "type_ids": type_ids,
+            "type_offsets": type_offsets,
+            "bodies": bodies,
+            "bodies_offsets": body_offsets,
+            "digests": digests,
+            **index_sections(quotes),
+        },
+    )
+
+
+class QuoteView(Sequence[Quote]):
+    """
+    Lazy sequence of some quotes of a corpus, given by their IDs. Quotes
+    are looked up in the corpus when accessed.
+    """
+
+    __slots__ = ("corpus", "ids")
+
+    def __init__(self, corpus: "QuoteCorpus", ids: Sequence[int]) -> None:
+        self.corpus = corpus
+        self.ids = ids
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return QuoteView(self.corpus, self.ids[index])
+        return self.corpus.get(self.ids[index])
+
+
+class QuoteCorpus:
+    """
+    Immutable, pre-indexed snapshot of the quote collection, read in place
+    from a compiled corpus (see `compile_corpus`).
+
+    A corpus is built once and then shared by every request. Every lookup is
+    served from columns and indexes computed when the corpus was compiled,
+    so no per-request filtering or allocation is needed regardless of the
+    corpus size:
+    - `get` looks a quote up by ID, by binary search.
+    - `pool` returns the quotes of a QuoteType.
+    - `encoded` returns the pre-encoded JSON body of a quote (`encode_quote`).
+    - `digest` returns the digest of a quote's content (`quote_digest`).
+    - `search_index` is an inverted index of the quote words, authors and
+      types (`SearchIndex`).
+
+    Quote models are only built for the quotes actually served, from their
+    pre-encoded body, and the most recently used are kept, so a given quote
+    is the same object while it is being served. The JSON bodies are served
+    without building any model.
+
+    A compiled corpus file is memory-mapped: loading it costs only reading
+    its header, its pages are read on demand, and they are shared by every
+    worker process of the host. A JSON file is compiled in memory instead.
+
+    A new snapshot is built for every reload and swapped in as a whole, so a
+    reader holding a reference to a corpus never observes a partial update.
+
+    Args:
+        data (CorpusFile): The compiled corpus.
+        last_modified (Optional[float]): When the quotes last changed.
+            Defaults to now.
+    """
+
+    __slots__ = (
+        "data",
+        "ids",
+        "types",
+        "bodies",
+        "digests",
+        "search_index",
+        "version",
+        "loaded_at",
+        "last_modified",
+        "load_seconds",
+        "_sorted_ids",
+        "_id_positions",
+        "_pools",
+        "_served",
+    )
+
+    def __init__(self, data: CorpusFile, last_modified: Optional[float] = None) -> None:
+        if data.meta["types"] != list(QUOTE_TYPES):
+            raise ValueError("Corpus compiled for other quote types, recompile it")
+        self.data = data
+        self.ids = data.section("ids")
+        self.types = data.section("types")
+        self.bodies = data.bytes_table("bodies")
+        self.digests = data.section("digests")
+        self._sorted_ids = data.section("sorted_ids")
+        self._id_positions = data.section("id_positions")
+        type_ids = data.section("type_ids")
+        type_offsets = data.section("type_offsets")
+        self._pools: dict[QuoteType, QuoteView] = {
+            quote_type: QuoteView(
+                self, type_ids[type_offsets[code] : type_offsets[code + 1]]
+            )
+            for code, quote_type in enumerate(QUOTE_TYPES)
+        }
+        # Maps a quote ID to its (position, Quote, body), or None.
+        self._served = lru_cache(maxsize=MODEL_CACHE_SIZE)(self._serve)
+        self.search_index = SearchIndex(
+            data, QuoteView(self, data.section("ranked_ids"))
+        )
+        self.version: str = data.meta["version"]
+        self.loaded_at: float = time.time()
+        self.last_modified: float = (
+            last_modified if last_modified is not None else self.loaded_at
+        )
+        # Time spent reading and compiling the source; set by `from_file`.
+        self.load_seconds: float = 0.0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _serve(self, id: int) -> Optional[tuple[int, Quote, bytes]]:
+        index = bisect_left(self._sorted_ids, id)
+        if index == len(self._sorted_ids) or self._sorted_ids[index] != id:
+            return None
+        position = self._id_positions[index]
+        body = self.bodies[position]
+        return position, Quote.model_validate_json(body), body
+
+    @property
+    def quotes(self) -> QuoteView:
+        return QuoteView(self, self.ids)
+
+    def get(self, id: int) -> Optional[Quote]:
+        served = self._served(id)
+        return None if served is None else served[1]
+
+    def _served_as(self, quote: Quote) -> Optional[tuple[int, Quote, bytes]]:
+        # None when `quote` was not served from this corpus, e.g. it comes
+        # from a corpus since reloaded.
+        served = self._served(quote.id)
+        return served if served is not None and served[1] is quote else None
+
+    def encoded(self, quote: Quote) -> Optional[bytes]:
+        """
+        Returns the pre-encoded JSON body of `quote` if it was served from
+        this corpus, or None.
+        """
+
+        served = self._served_as(quote)
+        return None if served is None else served[2]
+
+    def digest(self, quote: Quote) -> Optional[str]:
+        """
+        Returns the digest of the content of `quote` if it was served from
+        this corpus, or None.
+        """
+
+        served = self._served_as(quote)
+        if served is None:
+            return None
+        position = served[0]
+        return self.digests[8 * position : 8 * position + 8].hex()
+
+    def pool(self, quote_type: Optional[QuoteType] = None) -> Sequence[Quote]:
+        """
+        Returns the quotes of the given type, or every quote when `quote_type`
+        is None, as a lazy sequence.
+        """
+
+        if quote_type is None:
+            return self.quotes
+        return self._pools.get(quote_type, ())
+
+    def iter_encoded(
+        self, quote_type: Optional[QuoteType] = None, after: Optional[int] = None
+    ) -> Iterator[bytes]:
+        """
+        Yields the pre-encoded JSON bodies of the quotes of `quote_type` (or
+        of every quote), by ascending ID, starting after the ID `after`.
+        Nothing is materialized: the bodies are read from the compiled corpus
+        one by one.
+        """
+
+        sorted_ids, positions = self._sorted_ids, self._id_positions
+        bodies, types = self.bodies, self.types
+        code = None if quote_type is None else QUOTE_TYPES.index(quote_type)
+        start = 0 if after is None else bisect_right(sorted_ids, after)
+        for index in range(start, len(sorted_ids)):
+            position = positions[index]
+            if code is None or types[position] == code:
+                yield bodies[position]
+
+    @classmethod
+    def from_quotes(
+        cls,
+        quotes: Sequence[Quote],
+        version: str = "",
+        last_modified: Optional[float] = None,
+    ) -> "QuoteCorpus":
+        """
+        Compiles a corpus of `quotes` in memory.
+        """
+
+        return cls(CorpusFile(compile_corpus(quotes, version)), last_modified)
+
+    @classmethod
+    def from_file(cls, file_path: Union[str, Path]) -> "QuoteCorpus":
+        """
+        Loads a corpus from a compiled corpus file, memory-mapped, or from a
+        JSON file, validated (see `load_json_quotes`) and compiled in memory.
+
+        The file's modification time becomes the corpus `last_modified`.
+        The version of a JSON corpus is a digest of the file content; a
+        compiled corpus keeps the version of the JSON file it was compiled
+        from, so ETags and cursors do not depend on the format served.
+
+        Args:
+            file_path (Union[str, Path]): Path to the quote collection.
+
+        Raises:
+            ValueError: If the file is not a valid quote collection or
+                contains duplicate IDs.
+
+        Returns:
+            QuoteCorpus: The loaded and indexed corpus.
+        """
+
+        start = time.perf_counter()
+        if is_corpus_file(file_path):
+            corpus = cls(CorpusFile.open(file_path), os.stat(file_path).st_mtime)
+        else:
+            quotes, version, last_modified = load_json_quotes(file_path)
+            corpus = cls.from_quotes(quotes, version, last_modified)
+        corpus.load_seconds = time.perf_counter() - start
+        return corpus
@@ -0,0 +1,167 @@
+import json
+import mmap
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Iterable, Sequence, Union
+
+# Compiled corpus files start with this magic, followed by the length of a
+# JSON header describing the sections.
+MAGIC = b"QCORPUS1"
+_PREAMBLE = struct.Struct("<8sI")
+_ALIGNMENT = 8
+
+
+def is_corpus_file(path: Union[str, Path]) -> bool:
+    """
+    Tells whether `path` is a compiled corpus rather than a JSON file.
+    """
+
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def string_table(values: Iterable[bytes]) -> tuple[bytes, array]:
+    """
+    Concatenates `values` into one blob, and returns it with the offsets
+    of the values in it: value `i` is `blob[offsets[i]:offsets[i + 1]]`.
+    """
+
+    offsets = array("Q", [0])
+    parts = []
+    for value in values:
+        parts.append(value)
+        offsets.append(offsets[-1] + len(value))
+    return b"".join(parts), offsets
+
+
+def write_corpus_file(meta: dict, sections: dict[str, Union[array, bytes]]) -> bytes:
+    """
+    Serializes a compiled corpus: the preamble, a JSON header holding `meta`
+    and the layout of the sections, then every section, 8-byte aligned.
+
+    Sections are `array`s, stored with their native item format, or raw
+    `bytes`, and are read back as `memoryview`s by `CorpusFile`.
+    """
+
+    layout = {}
+    offset = 0
+    for name, section in sections.items():
+        typecode = section.typecode if isinstance(section, array) else "B"
+        size = len(memoryview(section).cast("B"))
+        layout[name] = [offset, size, typecode]
+        offset += size + -size % _ALIGNMENT
+    header = json.dumps(
+        {"meta": meta, "byteorder": sys.byteorder, "sections": layout},
+        separators=(",", ":"),
+    ).encode("utf-8")
+    start = _PREAMBLE.size + len(header)
+    padding = b"\0" * (-start % _ALIGNMENT)
+
+    parts = [_PREAMBLE.pack(MAGIC, len(header)), header, padding]
+    for section in sections.values():
+        data = memoryview(section).cast("B")
+        parts += [data, b"\0" * (-len(data) % _ALIGNMENT)]
+    return b"".join(parts)
+
+
+class ByteTable(Sequence[bytes]):
+    """
+    Read-only view of a string table (see `string_table`): item `i` is the
+    `i`-th value, copied out of the underlying buffer on access.
+    """
+
+    __slots__ = ("blob", "offsets")
+
+    def __init__(self, blob: memoryview, offsets: memoryview) -> None:
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> bytes:
+        if index < 0:
+            index += len(self)
+        return self.blob[self.offsets[index] : self.offsets[index + 1]].tobytes()
+
+
+class StringTable(ByteTable):
+    """
+    A `ByteTable` of UTF-8 strings, decoded on access.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += len(self)
+        return str(self.blob[self.offsets[index] : self.offsets[index + 1]], "utf-8")
+
+
+class CorpusFile:
+    """
+    A compiled corpus, read in place from a buffer: typically a read-only
+    memory map of the file (see `open`), whose pages are loaded on first
+    access and shared by every process mapping the same file.
+
+    Args:
+        buffer: The content of the compiled corpus.
+
+    Raises:
+        ValueError: If the buffer is not a compiled corpus, or was compiled
+            on a machine of another byte order.
+    """
+
+    def __init__(self, buffer: Union[bytes, mmap.mmap]) -> None:
+        self.buffer = buffer
+        view = memoryview(buffer)
+        if len(view) < _PREAMBLE.size:
+            raise ValueError("Not a compiled quote corpus")
+        magic, header_size = _PREAMBLE.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError("Not a compiled quote corpus")
+        header = json.loads(
+            view[_PREAMBLE.size : _PREAMBLE.size + header_size].tobytes()
+        )
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError(f"Corpus compiled for a {header['byteorder']}-endian host")
+        start = _PREAMBLE.size + header_size
+        self.meta: dict = header["meta"]
+        self._data = view[start + -start % _ALIGNMENT :]
+        self._layout: dict[str, list] = header["sections"]
+
+    @classmethod
+    def open(cls, file_path: Union[str, Path]) -> "CorpusFile":
+        """
+        Maps a compiled corpus file into memory.
+
+        The mapping stays valid when the file is replaced by a rename, but
+        not when it is rewritten in place, which compiled corpora therefore
+        never are.
+        """
+
+        with open(file_path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def section(self, name: str) -> memoryview:
+        """
+        Returns a section, as a memoryview of its item format.
+
+        Raises:
+            ValueError: If the corpus has no such section, e.g. it was
+                compiled by another version of the service.
+        """
+
+        try:
+            offset, size, typecode = self._layout[name]
+        except KeyError:
+            raise ValueError(f"Compiled corpus lacks section {name!r}, recompile it")
+        return self._data[offset : offset + size].cast(typecode)
+
+    def bytes_table(self, name: str) -> ByteTable:
+        return ByteTable(self.section(name), self.section(f"{name}_offsets"))
+
+    def string_table(self, name: str) -> StringTable:
+        return StringTable(self.section(name), self.section(f"{name}_offsets"))
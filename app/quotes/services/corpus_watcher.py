@@ -0,0 +1,45 @@
+import asyncio
+import logging
+import os
+
+from .quote_provider import QuoteProvider
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def _file_signature(provider: QuoteProvider) -> tuple[int, int]:
+    try:
+        stat = os.stat(provider.file_path)
+    except FileNotFoundError:
+        return (0, 0)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+async def watch_quotes_file(provider: QuoteProvider, interval: float = 2.0) -> None:
+    """
+    Reloads the provider's corpus whenever its quotes file changes.
+
+    The file is polled with `os.stat` every `interval` seconds, which is
+    cheap and needs no extra dependency. A change of modification time or
+    size triggers `QuoteProvider.reload`. Invalid files, and any other
+    reload failure, are logged and ignored, leaving the current corpus in
+    place: watching goes on, so a later fix of the file is picked up.
+
+    Args:
+        provider (QuoteProvider): The provider to keep up to date.
+        interval (float): Polling interval in seconds.
+    """
+
+    signature = _file_signature(provider)
+    while True:
+        await asyncio.sleep(interval)
+        current = _file_signature(provider)
+        if current == signature:
+            continue
+        signature = current
+        try:
+            await provider.reload()
+        except (OSError, ValueError) as exc:
+            logger.error(f"Failed to reload quotes from {provider.file_path}: {exc}")
+        except Exception:
+            logger.exception(f"Failed to reload quotes from {provider.file_path}")
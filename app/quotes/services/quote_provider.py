@@ -1,68 +1,330 @@
-from typing import Optional
-import json
 from pathlib import Path
+from typing import Callable, Iterator, Optional, Sequence, Union
+import asyncio
+import base64
+import itertools
+import binascii
+import hashlib
+import logging
 import random
 
+from anyio import to_thread
+
+from app.core.config import get_settings
+from app.core.metrics import CORPUS_LOAD_DURATION, CORPUS_SIZE
 from app.exceptions import NotFound
 
 from ..types import QuoteType
 from ..schemas import Quote
+from .corpus import QuoteCorpus, encode_quote, quote_digest
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def seed_hash(seed: str) -> int:
+    """
+    Maps a seed to a well-distributed 64-bit integer, identical across
+    processes and restarts (unlike the built-in `hash`).
+    """
+
+    return int.from_bytes(
+        hashlib.blake2b(seed.encode("utf-8"), digest_size=8).digest(), "big"
+    )
+
+
+def encode_cursor(version: str, rank: int) -> str:
+    return base64.urlsafe_b64encode(f"{version}:{rank}".encode("ascii")).decode("ascii")
+
+
+def decode_cursor(cursor: str, version: str) -> int:
+    """
+    Returns the rank a search cursor resumes after.
+
+    Raises:
+        ValueError: If the cursor is malformed, or was issued for another
+            version of the corpus, whose ranks differ.
+    """
+
+    try:
+        cursor_version, _, rank = (
+            base64.urlsafe_b64decode(cursor.encode("ascii"))
+            .decode("ascii")
+            .partition(":")
+        )
+        rank = int(rank)
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if cursor_version != version:
+        raise ValueError("The quotes changed since this cursor was issued")
+    return rank
 
 
 class QuoteProvider:
     """
     Mananges and provides access to a collection of quotes from a static JSON file.
 
-    This class handles the loading of quotes from a specified JSON file,
-    assigns a unique ID to each quote, and provides methods to retrieve quotes
-    randomly or by a specific ID or type.
+    The quotes are held in a `QuoteCorpus`, an immutable snapshot indexed by
+    ID and by type, so that random lookups are O(1), by-ID lookups
+    O(log n), and a single provider can be shared by every request.
+
+    The corpus can be replaced at runtime with `reload`, which builds the new
+    snapshot off the event loop and then swaps the reference atomically.
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        corpus: Optional[QuoteCorpus] = None,
+        file_path: Optional[Union[str, Path]] = None,
+    ) -> None:
+        """
+        Initializes the QuoteProvider.
+
+        Args:
+            corpus (Optional[QuoteCorpus]): A pre-built corpus. When omitted,
+                the corpus is loaded from `file_path`.
+            file_path (Optional[Union[str, Path]]): The quotes file to load
+                from and reload. Defaults to the configured quotes file.
+        """
+
+        self.file_path: Path = Path(file_path or get_settings().quotes_file)
+        if corpus is None:
+            corpus = QuoteCorpus.from_file(self.file_path)
+        self.corpus: QuoteCorpus = corpus
+        self._record_corpus_metrics(corpus)
+        self._reload_lock = asyncio.Lock()
+        self._reload_listeners: list[Callable[[QuoteCorpus], None]] = []
+
+    def add_reload_listener(self, listener: Callable[[QuoteCorpus], None]) -> None:
         """
-        Initializes the QuoteProvider by loading quotes from 'quotes.json'.
+        Registers a callback invoked with the new corpus after each reload
+        that changed it, e.g. to invalidate caches derived from the quotes.
+        """
+
+        self._reload_listeners.append(listener)
 
-        The method locates the 'quotes.json' file, reads its content, and
-        parses it into a list of Quote objects. Each quote is assigned a
-        unique integer ID.
+    async def reload(self) -> QuoteCorpus:
         """
+        Rebuilds the corpus from the quotes file and swaps it in.
 
-        current_dir = Path(__file__).parent.parent
-        file_path = current_dir / "data" / "quotes.json"
-        with open(file_path, "r") as f:
-            data = json.load(f)
-            self.quotes: list[Quote] = []
-            counter: int = 1
-            for q in data:
-                q["id"] = counter
-                counter += 1
-                self.quotes.append(Quote(**q))
+        The file is parsed and indexed in a worker thread so the event loop
+        is never blocked. Concurrent reloads are serialized. If the file is
+        invalid, the current corpus is kept and the error is re-raised.
 
-    def get_random_quote(self, quote_type: Optional[QuoteType] = None) -> Quote:
+        Returns:
+            QuoteCorpus: The corpus now being served.
+        """
+
+        async with self._reload_lock:
+            corpus = await to_thread.run_sync(QuoteCorpus.from_file, self.file_path)
+            if corpus.version != self.corpus.version:
+                self.corpus = corpus
+                self._record_corpus_metrics(corpus)
+                for listener in self._reload_listeners:
+                    listener(corpus)
+                logger.info(f"Reloaded {len(corpus)} quotes (version {corpus.version})")
+            return self.corpus
+
+    @staticmethod
+    def _record_corpus_metrics(corpus: QuoteCorpus) -> None:
+        CORPUS_SIZE.set(len(corpus))
+        CORPUS_LOAD_DURATION.set(corpus.load_seconds)
+
+    @property
+    def quotes(self) -> Sequence[Quote]:
+        return self.corpus.quotes
+
+    def get_random_quote(
+        self,
+        quote_type: Optional[QuoteType] = None,
+        seed: Optional[str] = None,
+        weights: Optional[dict[QuoteType, int]] = None,
+        author: Optional[str] = None,
+    ) -> Quote:
         """
         Retrieves a random quote.
 
         If a `quote_type` is provided, a random quote of that specific type
         is returned. Otherwise, a random quote from the entire collection is
-        returned.
+        returned, or, when `weights` is given, a quote whose type is drawn
+        with the given relative weights.
+
+        When a `seed` is provided, the choice is deterministic: the same seed
+        always selects the same quote for a given corpus. It is derived from
+        a hash of the seed, without any RNG state.
+
+        With an `author`, the quote is drawn among the quotes whose author
+        name contains every word of `author`, looked up in the search index.
 
         Args:
             quote_type (Optional[QuoteType]): The type of quote to filter by.
+            seed (Optional[str]): Makes the selection deterministic.
+            weights (Optional[dict[QuoteType, int]]): Relative weights of
+                the quote types. Ignored when `quote_type` is given.
+            author (Optional[str]): Words of the author name.
 
         Raises:
-            NotFound: If no quotes are found for the specified type.
+            NotFound: If no quotes are found for the specified type(s).
 
         Returns:
             Quote: A randomly selected Quote object.
         """
 
-        if quote_type:
-            filtered_quotes = [q for q in self.quotes if q.type == quote_type]
-            if not filtered_quotes:
-                raise NotFound()
-            return random.choice(filtered_quotes)
+        corpus = self.corpus
+        if seed is None:
+            type_draw, index_draw = random.random(), None
+        else:
+            hashed = seed_hash(seed)
+            type_draw, index_draw = (hashed >> 32) / 2**32, hashed & 0xFFFFFFFF
+
+        if quote_type is None and weights:
+            quote_type = self._pick_type(corpus, weights, type_draw)
+        if author:
+            # Only ranks are materialized; the quote is looked up once drawn.
+            index = corpus.search_index
+            pool = index.author_ranks(author, quote_type)
+            ranked = index.ranked
+        else:
+            pool = corpus.pool(quote_type)
+            ranked = None
+        if not pool:
+            raise NotFound()
+        if index_draw is None:
+            chosen = random.choice(pool)
+        else:
+            chosen = pool[index_draw % len(pool)]
+        return chosen if ranked is None else ranked[chosen]
+
+    @staticmethod
+    def _pick_type(
+        corpus: QuoteCorpus, weights: dict[QuoteType, int], draw: float
+    ) -> QuoteType:
+        """
+        Picks a quote type with probability proportional to its weight,
+        given a uniform `draw` in [0, 1). Types without quotes are skipped.
+        """
+
+        candidates = sorted(
+            (t, w) for t, w in weights.items() if w > 0 and corpus.pool(t)
+        )
+        if not candidates:
+            raise NotFound()
+        threshold = draw * sum(w for _, w in candidates)
+        for quote_type, weight in candidates:
+            threshold -= weight
+            if threshold < 0:
+                return quote_type
+        return candidates[-1][0]
+
+    def get_random_quotes(
+        self, count: int, quote_type: Optional[QuoteType] = None
+    ) -> list[Quote]:
+        """
+        Retrieves up to `count` distinct random quotes.
+
+        The quotes are sampled without replacement in a single pass over the
+        indexed pool, so no quote appears twice. If the pool holds fewer
+        than `count` quotes, all of them are returned in random order.
+
+        Args:
+            count (int): The number of quotes to retrieve.
+            quote_type (Optional[QuoteType]): The type of quote to filter by.
+
+        Raises:
+            NotFound: If no quotes are found for the specified type.
+
+        Returns:
+            list[Quote]: The randomly selected Quote objects.
+        """
+
+        pool = self.corpus.pool(quote_type)
+        if not pool:
+            raise NotFound()
+        return random.sample(pool, min(count, len(pool)))
+
+    def search_quotes(
+        self,
+        text: Optional[str] = None,
+        author: Optional[str] = None,
+        quote_type: Optional[QuoteType] = None,
+        cursor: Optional[str] = None,
+        limit: int = 20,
+    ) -> tuple[list[Quote], Optional[str]]:
+        """
+        Searches the quotes with the corpus' inverted index.
+
+        Results match every word of `text` (in the quote or its author, the
+        last word also as a prefix), every word of `author` and the
+        `quote_type`, shortest quote first. See `SearchIndex`.
+
+        Args:
+            text (Optional[str]): Words to search for.
+            author (Optional[str]): Words of the author name.
+            quote_type (Optional[QuoteType]): The type of quote to filter by.
+            cursor (Optional[str]): The `next_cursor` of the previous page.
+            limit (int): The maximum number of quotes returned.
+
+        Raises:
+            ValueError: If the cursor is invalid or stale, or if the last
+                word of `text` is too short to match as a prefix.
 
-        return random.choice(self.quotes)
+        Returns:
+            tuple[list[Quote], Optional[str]]: The page of quotes, and the
+            cursor of the next page, or None if this is the last one.
+        """
+
+        corpus = self.corpus
+        index = corpus.search_index
+        after = -1 if cursor is None else decode_cursor(cursor, corpus.version)
+        # One extra result tells whether there is a next page.
+        ranks = index.search(text, author, quote_type, after=after, limit=limit + 1)
+        next_cursor = None
+        if len(ranks) > limit:
+            ranks = ranks[:limit]
+            next_cursor = encode_cursor(corpus.version, ranks[-1])
+        return [index.ranked[rank] for rank in ranks], next_cursor
+
+    def export_quotes(
+        self,
+        quote_type: Optional[QuoteType] = None,
+        after: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[bytes]:
+        """
+        Iterates over the JSON bodies of the quotes, by ascending ID.
+
+        The iterator reads the corpus being served when it was created, so
+        an export is consistent even if the quotes are reloaded meanwhile.
+        Quote IDs are stable across reloads, so an interrupted export can be
+        resumed after the last ID received, even from another corpus.
+
+        Args:
+            quote_type (Optional[QuoteType]): The type of quote to filter by.
+            after (Optional[int]): Only quotes with a greater ID are exported.
+            limit (Optional[int]): At most this many quotes are exported.
+
+        Returns:
+            Iterator[bytes]: The pre-encoded JSON body of each quote.
+        """
+
+        return itertools.islice(self.corpus.iter_encoded(quote_type, after), limit)
+
+    def get_quotes_by_ids(self, ids: list[int]) -> list[Quote]:
+        """
+        Retrieves the quotes with the given IDs, in the order requested.
+
+        Unknown and repeated IDs are skipped, so the result may hold fewer
+        quotes than requested.
+
+        Args:
+            ids (list[int]): The IDs of the quotes to retrieve.
+
+        Returns:
+            list[Quote]: The Quote objects found.
+        """
+
+        corpus = self.corpus
+        quotes = (corpus.get(id) for id in dict.fromkeys(ids))
+        return [quote for quote in quotes if quote is not None]
 
     def get_quote_by_id(self, id: int) -> Quote:
         """
@@ -78,10 +340,40 @@ class QuoteProvider:
             Quote: The Quote object with the matching ID.
         """
 
-        found_quote = None
-        for quote in self.quotes:
-            if quote.id == id:
-                found_quote = quote
-        if not found_quote:
+        found_quote = self.corpus.get(id)
+        if found_quote is None:
             raise NotFound()
         return found_quote
+
+    def get_quote_digest(self, quote: Quote) -> str:
+        """
+        Returns the content digest of a quote served by this provider.
+
+        The digest precomputed by the corpus is used when `quote` belongs to
+        the current corpus; otherwise (the corpus was reloaded in between)
+        it is computed from the quote itself.
+        """
+
+        digest = self.corpus.digest(quote)
+        return digest if digest is not None else quote_digest(quote)
+
+    def get_quote_json(self, quote: Quote) -> bytes:
+        """
+        Returns the JSON body of a quote served by this provider, pre-encoded
+        by the corpus when `quote` belongs to the current one.
+        """
+
+        encoded = self.corpus.encoded(quote)
+        return encoded if encoded is not None else encode_quote(quote)
+
+    def get_quotes_json(self, quotes: list[Quote]) -> bytes:
+        """
+        Returns the JSON array of `quotes`, joined from their pre-encoded
+        bodies without serializing anything.
+        """
+
+        return b"[" + b",".join(map(self.get_quote_json, quotes)) + b"]"
+
+    @property
+    def last_modified(self) -> float:
+        return self.corpus.last_modified
@@ -0,0 +1,125 @@
+import io
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import cache
+from multiprocessing import get_context
+from typing import Optional
+
+from app.exceptions import NotSupported, ServiceUnavailable
+
+# Raster cards are rendered at twice their CSS size so they stay sharp on
+# HiDPI screens, where most chat and email clients display them.
+RASTER_SCALE = 2
+
+
+def rasterize(svg: bytes, image_format: str, width: int, height: int) -> bytes:
+    """
+    Converts an SVG card to a PNG or WebP image.
+
+    Runs inside a worker process of `RasterPool`. Requires the optional
+    `cairosvg` package, plus `Pillow` for WebP output.
+    """
+
+    import cairosvg
+
+    png = cairosvg.svg2png(
+        bytestring=svg,
+        output_width=width * RASTER_SCALE,
+        output_height=height * RASTER_SCALE,
+    )
+    if image_format == "png":
+        return png
+
+    from PIL import Image
+
+    output = io.BytesIO()
+    Image.open(io.BytesIO(png)).save(output, format=image_format.upper(), quality=90)
+    return output.getvalue()
+
+
+@cache
+def missing_dependency(image_format: str) -> Optional[str]:
+    """
+    Returns the name of the optional package needed to produce
+    `image_format` that cannot be imported, or None if none is missing.
+    """
+
+    try:
+        import cairosvg  # noqa: F401
+    except (ImportError, OSError):  # OSError: the cairo library is missing
+        return "cairosvg"
+    if image_format != "png":
+        try:
+            from PIL import features
+
+            if not features.check(image_format):
+                return "Pillow"
+        except ImportError:
+            return "Pillow"
+    return None
+
+
+class RasterPool:
+    """
+    Rasterizes SVG cards in a bounded pool of worker processes.
+
+    Rasterization is CPU-bound, so it runs in separate processes and never
+    holds the GIL of the API workers. At most `max_workers + max_queue`
+    jobs are accepted at a time; beyond that, requests are rejected with
+    `503 Service Unavailable` and a `Retry-After` header instead of being
+    queued without limit.
+    """
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 8) -> None:
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    # Forking a threaded server process is unsafe; spawn instead.
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers, mp_context=get_context("spawn")
+                    )
+        return self._executor
+
+    async def rasterize(
+        self, svg: bytes, image_format: str, width: int, height: int
+    ) -> bytes:
+        """
+        Rasterizes an SVG card. Waiting for the worker process holds no
+        thread.
+
+        Raises:
+            NotSupported: If the packages needed for `image_format` are not
+                installed.
+            ServiceUnavailable: If the pool and its queue are full.
+
+        Returns:
+            bytes: The encoded image.
+        """
+
+        missing = missing_dependency(image_format)
+        if missing:
+            raise NotSupported(
+                f"{image_format.upper()} output requires the optional '{missing}' package"
+            )
+        if not self._slots.acquire(blocking=False):
+            raise ServiceUnavailable("Image rendering is busy, please retry shortly")
+        try:
+            return await asyncio.wrap_future(
+                self.executor.submit(rasterize, svg, image_format, width, height)
+            )
+        finally:
+            self._slots.release()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from app.core.metrics import RENDER_QUEUE_DURATION
+from app.exceptions import ServiceUnavailable
+
+T = TypeVar("T")
+
+
+class RenderPool:
+    """
+    Renders SVG cards in a dedicated, bounded pool of threads.
+
+    Laying out and templating a card is CPU-bound, so it runs neither on the
+    event loop nor in the threadpool FastAPI shares with the rest of the
+    app: a burst of renders cannot delay requests that need no rendering.
+    At most `max_workers` cards are rendered at a time and `max_queue` more
+    may wait for a thread; beyond that, requests are rejected with
+    `503 Service Unavailable` and a `Retry-After` header. The time jobs wait
+    for a thread is recorded in `quote_render_queue_duration_seconds`.
+    """
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 512) -> None:
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="svg-render"
+                    )
+        return self._executor
+
+    async def run(self, func: Callable[..., T], *args) -> T:
+        """
+        Runs `func(*args)` in the pool and waits for its result without
+        blocking the event loop.
+
+        Raises:
+            ServiceUnavailable: If the pool and its queue are full.
+        """
+
+        if not self._slots.acquire(blocking=False):
+            raise ServiceUnavailable("Image rendering is busy, please retry shortly")
+        submitted = time.perf_counter()
+
+        def job() -> T:
+            RENDER_QUEUE_DURATION.observe(time.perf_counter() - submitted)
+            return func(*args)
+
+        try:
+            return await asyncio.wrap_future(self.executor.submit(job))
+        finally:
+            self._slots.release()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
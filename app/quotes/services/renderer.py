@@ -0,0 +1,179 @@
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from app.core.cache import LRUCache
+from app.core.compression import Compressor, EncodedBody
+from app.core.metrics import RENDER_DURATION
+
+from ..schemas import Quote
+from ..types import QuoteResponseType
+from .avatar_store import AvatarStore
+from .corpus import quote_digest
+from .rasterizer import RasterPool
+from .render_pool import RenderPool
+from .svg_converter import SVGConverter
+
+MEDIA_TYPES: dict[QuoteResponseType, str] = {
+    QuoteResponseType.svg: "image/svg+xml",
+    QuoteResponseType.png: "image/png",
+    QuoteResponseType.webp: "image/webp",
+}
+
+
+@dataclass(frozen=True)
+class RenderedCard:
+    """
+    A quote card rendered in one of the image formats.
+
+    Attributes:
+        content (bytes): The encoded image.
+        media_type (str): The MIME type of `content`.
+        complete (bool): False if the card had to be rendered without its
+            avatar. Such cards are neither cached nor cacheable by clients.
+        cache_hit (bool): True if the card was served from a cache.
+        variants (dict[str, bytes]): Compressed variants of `content`,
+            keyed by content coding (SVG cards only).
+    """
+
+    content: bytes
+    media_type: str
+    complete: bool = True
+    cache_hit: bool = False
+    variants: dict[str, bytes] = field(default_factory=dict)
+
+
+class QuoteRenderer:
+    """
+    Renders quote cards as SVG, PNG or WebP images, with caching.
+
+    SVG cards are cached on `(quote digest, theme, width, height)` and
+    raster images on `(quote digest, format, theme, width, height)`, where
+    the digest (see `quote_digest`) covers the whole content of the quote:
+    a render still running when the quotes are reloaded can only cache the
+    card of the old content, under a key the new content never looks up.
+    Raster images are
+    produced from the (cached) SVG card by a `RasterPool`. SVG cards are
+    compressed (see `Compressor`) when rendered, and cached along with
+    their compressed variants.
+
+    Rendering is asynchronous: cache hits and avatar fetches are served on
+    the event loop, SVG cards are laid out in a `RenderPool` and raster
+    images encoded in the `RasterPool`, so no request holds a thread while
+    it waits.
+    """
+
+    def __init__(
+        self,
+        avatar_store: AvatarStore,
+        svg_cache: LRUCache[EncodedBody],
+        raster_cache: LRUCache[bytes],
+        raster_pool: RasterPool,
+        render_pool: RenderPool,
+        compressor: Compressor,
+        avatar_timeout: float,
+        quote_digest: Callable[[Quote], str] = quote_digest,
+    ) -> None:
+        self.avatar_store = avatar_store
+        self.svg_cache = svg_cache
+        self.raster_cache = raster_cache
+        self.raster_pool = raster_pool
+        self.render_pool = render_pool
+        self.compressor = compressor
+        self.avatar_timeout = avatar_timeout
+        self.quote_digest = quote_digest
+
+    async def render(
+        self,
+        quote: Quote,
+        response_type: QuoteResponseType,
+        svg_converter: SVGConverter,
+    ) -> RenderedCard:
+        """
+        Renders `quote` in the image format given by `response_type`.
+
+        Raises:
+            NotSupported: If a raster format is requested but the optional
+                rasterization packages are not installed.
+            ServiceUnavailable: If the render or rasterization pool is
+                saturated.
+        """
+
+        if response_type == QuoteResponseType.svg:
+            return await self.render_svg(quote, svg_converter)
+
+        cache_key = (
+            self.quote_digest(quote),
+            response_type.value,
+            svg_converter.theme,
+            svg_converter.width,
+            svg_converter.height,
+        )
+        media_type = MEDIA_TYPES[response_type]
+        image = self.raster_cache.get(cache_key)
+        if image is not None:
+            return RenderedCard(image, media_type, cache_hit=True)
+
+        svg = await self.render_svg(quote, svg_converter)
+        start = time.perf_counter()
+        image = await self.raster_pool.rasterize(
+            svg.content, response_type.value, svg_converter.width, svg_converter.height
+        )
+        RENDER_DURATION.labels(response_type.value).observe(time.perf_counter() - start)
+        if svg.complete:
+            self.raster_cache.set(cache_key, image)
+        return RenderedCard(image, media_type, complete=svg.complete)
+
+    async def render_svg(
+        self, quote: Quote, svg_converter: SVGConverter
+    ) -> RenderedCard:
+        """
+        Renders `quote` as an SVG card.
+
+        If the avatar is not available within `avatar_timeout`, the card is
+        rendered without it and is not cached.
+        """
+
+        cache_key = (
+            self.quote_digest(quote),
+            svg_converter.theme,
+            svg_converter.width,
+            svg_converter.height,
+        )
+        media_type = MEDIA_TYPES[QuoteResponseType.svg]
+        cached = self.svg_cache.get(cache_key)
+        if cached is not None:
+            return RenderedCard(
+                cached.identity, media_type, cache_hit=True, variants=cached.variants
+            )
+
+        avatar = None
+        if quote.author_avatar_url:
+            avatar = await self.avatar_store.get(
+                str(quote.author_avatar_url), self.avatar_timeout
+            )
+        quote_svg = await self.render_pool.run(
+            _render_svg, svg_converter, quote, avatar, self.compressor
+        )
+        complete = bool(avatar or not quote.author_avatar_url)
+        if complete:
+            self.svg_cache.set(cache_key, quote_svg)
+        return RenderedCard(
+            quote_svg.identity,
+            media_type,
+            complete=complete,
+            variants=quote_svg.variants,
+        )
+
+
+def _render_svg(
+    svg_converter: SVGConverter,
+    quote: Quote,
+    avatar: Optional[str],
+    compressor: Compressor,
+) -> EncodedBody:
+    start = time.perf_counter()
+    quote_svg = svg_converter.render(quote, avatar=avatar)
+    RENDER_DURATION.labels("svg").observe(time.perf_counter() - start)
+    # Compressed in the render pool too, off the event loop.
+    return compressor.encode(quote_svg)
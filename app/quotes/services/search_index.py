@@ -0,0 +1,330 @@
+import re
+import sys
+import unicodedata
+from array import array
+import heapq
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from functools import lru_cache
+from typing import Optional, Sequence, Union, get_args
+
+from ..schemas import Quote
+from ..types import QuoteType
+from .corpus_file import CorpusFile, string_table
+
+_TOKEN = re.compile(r"\w+")
+
+# Namespaces of the index keys: a quote's text (and author) words, its
+# author's words, its author's normalized full name, and its type.
+TEXT = "t:"
+AUTHOR = "a:"
+NAME = "n:"
+TYPE = "y:"
+
+# Shortest last word of a query, which matches as a prefix: a single letter
+# would match a large part of the vocabulary.
+MIN_PREFIX_LENGTH = 2
+# Number of (author, type) lookups whose matches are kept.
+AUTHOR_CACHE_SIZE = 4096
+# Number of index keys (and prefixes) whose posting arrays are kept.
+KEY_CACHE_SIZE = 16384
+# Types are stored as their index in this tuple.
+QUOTE_TYPES: tuple[QuoteType, ...] = get_args(QuoteType)
+
+
+def normalize(text: str) -> str:
+    """
+    Case-folds `text` and strips its accents, so that `Émile` matches
+    `emile`.
+    """
+
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Splits `text` into normalized words.
+    """
+
+    return _TOKEN.findall(normalize(text))
+
+
+class _Postings:
+    """
+    Sorted ranks of the quotes matching one query term: the union of the
+    posting arrays of every indexed word the term matches.
+
+    A query only ever seeks forward, so each array keeps its position and,
+    for a union, the arrays are kept in a heap by their next rank.
+    """
+
+    __slots__ = ("arrays", "size", "_heads", "_position")
+
+    def __init__(self, arrays: list[array]) -> None:
+        self.arrays = arrays
+        self.size = sum(len(a) for a in arrays)
+        self._position = 0
+        self._heads = [(a[0], i, 0) for i, a in enumerate(arrays) if a]
+        heapq.heapify(self._heads)
+
+    def seek(self, rank: int) -> Optional[int]:
+        """
+        Returns the smallest rank >= `rank` in the postings, or None. Must be
+        called with non-decreasing ranks.
+        """
+
+        if len(self.arrays) == 1:
+            postings = self.arrays[0]
+            self._position = bisect_left(postings, rank, self._position)
+            if self._position < len(postings):
+                return postings[self._position]
+            return None
+
+        heads = self._heads
+        while heads and heads[0][0] < rank:
+            _, i, position = heads[0]
+            postings = self.arrays[i]
+            position = bisect_left(postings, rank, position + 1)
+            if position < len(postings):
+                heapq.heapreplace(heads, (postings[position], i, position))
+            else:
+                heapq.heappop(heads)
+        return heads[0][0] if heads else None
+
+
+def _intersect(terms: list[_Postings], after: int, limit: Optional[int]) -> list[int]:
+    """
+    Returns the ranks greater than `after` found in every term, at most
+    `limit` of them, by leapfrogging between the terms. The rarest term
+    should come first. Without terms, nothing matches.
+    """
+
+    if not terms:
+        return []
+    ranks: list[int] = []
+    candidate = after + 1
+    while limit is None or len(ranks) < limit:
+        for term in terms:
+            found = term.seek(candidate)
+            if found is None:
+                return ranks
+            if found != candidate:
+                candidate = found
+                break
+        else:
+            ranks.append(candidate)
+            candidate += 1
+    return ranks
+
+
+def _author_keys(author: Optional[str], quote_type: QuoteType) -> frozenset[str]:
+    words = tokenize(author) if author else []
+    keys = {TEXT + word for word in words}
+    keys.update(AUTHOR + word for word in words)
+    if words:
+        keys.add(NAME + " ".join(words))
+    keys.add(TYPE + quote_type)
+    return frozenset(keys)
+
+
+def index_sections(quotes: Sequence[Quote]) -> dict[str, Union[array, bytes]]:
+    """
+    Builds the inverted index of `quotes`, as the sections of a compiled
+    corpus (see `SearchIndex`):
+    - `ranked_ids`: the ID of the quote of each rank.
+    - `rank_types`: the type code (`QUOTE_TYPES` index) of each rank.
+    - `vocabulary`: the sorted index keys, as a string table.
+    - `postings`: the ranks of every key, concatenated in vocabulary order,
+      with their `postings_offsets`.
+    """
+
+    ranked = sorted(
+        range(len(quotes)), key=lambda i: (len(quotes[i].quote), quotes[i].id)
+    )
+    postings: dict[str, list[int]] = defaultdict(list)
+    # Authors and types repeat, so their keys are computed once each.
+    author_keys: dict[tuple[Optional[str], str], frozenset[str]] = {}
+    for rank, position in enumerate(ranked):
+        quote = quotes[position]
+        shared = author_keys.get((quote.author, quote.type))
+        if shared is None:
+            shared = author_keys[quote.author, quote.type] = _author_keys(
+                quote.author, quote.type
+            )
+        keys = shared.union([TEXT + word for word in tokenize(quote.quote)])
+        for key in keys:
+            postings[key].append(rank)
+
+    vocabulary = sorted(postings)
+    blob, offsets = string_table(key.encode("utf-8") for key in vocabulary)
+    flat = array("I")
+    flat_offsets = array("Q", [0])
+    for key in vocabulary:
+        flat.extend(postings.pop(key))
+        flat_offsets.append(len(flat))
+    return {
+        "ranked_ids": array("q", (quotes[i].id for i in ranked)),
+        "rank_types": array("B", (QUOTE_TYPES.index(quotes[i].type) for i in ranked)),
+        "vocabulary": blob,
+        "vocabulary_offsets": offsets,
+        "postings": flat,
+        "postings_offsets": flat_offsets,
+    }
+
+
+class SearchIndex:
+    """
+    Inverted index of a quote corpus, compiled with the corpus and read in
+    place from it (see `index_sections`).
+
+    Quotes are ranked once, when the index is built: by length, shortest
+    first, then by ID. Results are returned in that static order, whatever
+    the query; they are not scored against it. Each indexed word (quote text
+    and author words, author words alone, and the quote type) maps to the
+    sorted array of the ranks of the quotes containing it. Full author
+    names are indexed too, so filtering on a whole (normalized) name, e.g.
+    `benjamin FRANKLIN`, is a single lookup.
+
+    A query intersects the posting arrays of its terms by leapfrogging
+    between them with binary searches, from a cursor rank, and stops as
+    soon as a page is full. The cost of a query therefore depends on the
+    page size and on how often its terms co-occur, not on the size of the
+    corpus. The quotes of an author (and type) are intersected once and
+    cached, as they are looked up repeatedly to draw random quotes.
+
+    Args:
+        data (CorpusFile): The compiled corpus holding the index sections.
+        ranked (Sequence[Quote]): The quotes, by rank.
+    """
+
+    def __init__(self, data: CorpusFile, ranked: Sequence[Quote]) -> None:
+        self.ranked = ranked
+        self.rank_types = data.section("rank_types")
+        self.vocabulary: Sequence[str] = data.string_table("vocabulary")
+        self._postings = data.section("postings")
+        self._offsets = data.section("postings_offsets")
+        self._author_ranks = lru_cache(maxsize=AUTHOR_CACHE_SIZE)(
+            self._intersect_author
+        )
+        # Each step of a binary search of the vocabulary decodes a key.
+        self._lookup = lru_cache(maxsize=KEY_CACHE_SIZE)(self._find)
+
+    def __len__(self) -> int:
+        return len(self.ranked)
+
+    def _at(self, index: int) -> memoryview:
+        return self._postings[self._offsets[index] : self._offsets[index + 1]]
+
+    def _find(self, key: str, prefix: bool) -> tuple[memoryview, ...]:
+        vocabulary = self.vocabulary
+        start = bisect_left(vocabulary, key)
+        if not prefix:
+            if start < len(vocabulary) and vocabulary[start] == key:
+                return (self._at(start),)
+            return ()
+        # Every key starting with `key` sorts before `key` + the last code
+        # point.
+        stop = bisect_left(vocabulary, key + chr(sys.maxunicode), start)
+        return tuple(self._at(index) for index in range(start, stop))
+
+    def postings(self, key: str) -> Optional[memoryview]:
+        """
+        Returns the sorted ranks of the quotes indexed under `key`, or None.
+        """
+
+        found = self._lookup(key, False)
+        return found[0] if found else None
+
+    def _term(self, key: str, prefix: bool = False) -> _Postings:
+        return _Postings(list(self._lookup(key, prefix)))
+
+    def _intersect_author(
+        self, words: tuple[str, ...], quote_type: Optional[QuoteType]
+    ) -> Sequence[int]:
+        if not words:
+            # e.g. `!!!`: an author filter without words matches no author.
+            return array("I")
+        ranks = self.postings(NAME + " ".join(words))
+        if ranks is None:
+            terms = sorted(
+                (self._term(AUTHOR + word) for word in words),
+                key=lambda term: term.size,
+            )
+            ranks = array("I", _intersect(terms, -1, None))
+        if quote_type is not None:
+            code = QUOTE_TYPES.index(quote_type)
+            types = self.rank_types
+            ranks = array("I", (r for r in ranks if types[r] == code))
+        return ranks
+
+    def author_ranks(
+        self, author: str, quote_type: Optional[QuoteType] = None
+    ) -> Sequence[int]:
+        """
+        Returns the ranks of the quotes whose author name contains every
+        word of `author`, and of `quote_type` if given; none if `author` has
+        no words. Results are cached and shared.
+        """
+
+        return self._author_ranks(tuple(tokenize(author)), quote_type)
+
+    def search(
+        self,
+        text: Optional[str] = None,
+        author: Optional[str] = None,
+        quote_type: Optional[QuoteType] = None,
+        after: int = -1,
+        limit: Optional[int] = None,
+    ) -> list[int]:
+        """
+        Returns the ranks of the quotes matching every word of `text` (in
+        their text or author), every word of `author` and `quote_type`. The
+        last word of `text` also matches as a prefix, e.g. `sav` matches
+        `saving`: it is looked up as the union of every indexed word it
+        starts.
+
+        Args:
+            text (Optional[str]): Words to search for.
+            author (Optional[str]): Words of the author name.
+            quote_type (Optional[QuoteType]): The type of the quotes.
+            after (int): Only ranks greater than this one are returned,
+                e.g. the last rank of the previous page.
+            limit (Optional[int]): At most this many ranks are returned.
+                All of them when None.
+
+        Returns:
+            list[int]: The ranks, in ascending order, i.e. shortest quote
+            first. Empty when no criterion is given.
+
+        Raises:
+            ValueError: If the last word of `text` is shorter than
+                `MIN_PREFIX_LENGTH`.
+        """
+
+        terms = []
+        words = tokenize(text) if text else []
+        if words and len(words[-1]) < MIN_PREFIX_LENGTH:
+            raise ValueError(
+                f"The last search word matches as a prefix and needs at least"
+                f" {MIN_PREFIX_LENGTH} characters: {words[-1]!r}"
+            )
+        for i, word in enumerate(words):
+            # The last word may still be being typed: it matches as a prefix.
+            terms.append(self._term(TEXT + word, prefix=i == len(words) - 1))
+        if author:
+            terms.append(_Postings([self.author_ranks(author, quote_type)]))
+        elif quote_type is not None:
+            terms.append(self._term(TYPE + quote_type))
+        if not terms:
+            return []
+        if len(terms) == 1 and len(terms[0].arrays) <= 1:
+            postings = terms[0].arrays[0] if terms[0].arrays else array("I")
+            start = bisect_right(postings, after)
+            stop = None if limit is None else start + limit
+            return postings[start:stop].tolist()
+        # The rarest term drives the intersection.
+        terms.sort(key=lambda term: term.size)
+        return _intersect(terms, after, limit)
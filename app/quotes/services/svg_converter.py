@@ -1,170 +1,222 @@
+from dataclasses import fields
+from functools import lru_cache
 from html import escape
-import base64
-
-import requests
+from typing import Optional, Union
 
 from app.quotes.types import Theme
 from app.quotes.schemas import Quote
 
+from .text_layout import FONT_STACK, layout_text
+from .themes import THEMES, ThemePalette
+
+
+def _escape(s: str) -> str:
+    return escape(s, quote=True)
+
+
+class SVGTemplate:
+    """
+    The static fragments of a quote card for one palette, size and padding.
+
+    Everything that does not depend on the quote (XML prolog, gradient and
+    filter definitions, background, card, colors) is formatted and encoded
+    once; rendering a quote only fills the slots in between.
+    """
+
+    __slots__ = ("head", "body", "text_attrs", "text_fill", "author_open", "tail")
+
+    def __init__(
+        self, palette: ThemePalette, width: int, height: int, padding: int
+    ) -> None:
+        color = {f.name: _escape(getattr(palette, f.name)) for f in fields(palette)}
+
+        # <svg ... aria-label="{slot}
+        self.head = (
+            f'<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}"\n'
+            f'     viewBox="0 0 {width} {height}" role="img"\n'
+            f'     aria-label="'
+        ).encode("utf-8")
+
+        # ..."> <defs/> background, card, then the avatar {slot}
+        self.body = f'''">
+  <defs>
+    <linearGradient id="g" x1="0" x2="1" y1="0" y2="1">
+      <stop offset="0%" stop-color="{color["accent_from"]}"/>
+      <stop offset="100%" stop-color="{color["accent_to"]}"/>
+    </linearGradient>
+
+    <filter id="f" x="-20%" y="-20%" width="140%" height="140%">
+      <feDropShadow dx="0" dy="8" stdDeviation="18" flood-color="#000" flood-opacity="0.12"/>
+    </filter>
+  </defs>
+
+  <!-- background -->
+  <rect width="100%" height="100%" fill="{color["bg"]}" />
+
+  <!-- gradient card -->
+  <rect x="{padding / 2}" y="{padding / 2}" rx="24" ry="24"
+        width="{width - padding}" height="{height - padding}"
+        fill="url(#g)" opacity="0.08" filter="url(#f)" />
+
+  <!-- main content -->
+  <g>
+    '''.encode("utf-8")
+
+        # <text x="{slot}" y="{slot}" ... font-size="{slot}" fill=...>{tspans}
+        self.text_attrs = (
+            f'"\n          font-family="{FONT_STACK}"\n          font-size="'
+        ).encode("utf-8")
+        self.text_fill = (f'" fill="{color["fg"]}" font-weight="600">\n      ').encode(
+            "utf-8"
+        )
+
+        # <text x=... y="{slot}" ... font-size="{slot}" fill=...>— {author}</text>
+        self.author_open = (
+            f'<text x="{width - padding}" y="',
+            f'" font-family="{FONT_STACK}" font-size="',
+            f'" fill="{color["author_fg"]}" text-anchor="end">— ',
+        )
+
+        self.tail = b"\n  </g>\n</svg>\n"
+
+
+@lru_cache(maxsize=256)
+def compile_template(
+    palette: ThemePalette, width: int, height: int, padding: int
+) -> SVGTemplate:
+    """
+    Returns the compiled template of a card, building it on first use.
+    """
+
+    return SVGTemplate(palette, width, height, padding)
+
 
 class SVGConverter:
     """
     Convert a Quote -> SVG string.
     - Pure SVG (no foreignObject) using <text> & <tspan>.
-    - Avatar is referenced by URL with <image href="..."> (not embedded).
+    - Avatar is embedded with <image href="data:..."> from a data URI
+      supplied by the caller (see `AvatarStore`); no I/O happens here.
+    - The static parts of the card come from a compiled `SVGTemplate`
+      shared by every render of the same theme and size.
     """
 
-    def __init__(self, width: int = 600, height: int = 300, theme: Theme = Theme.light):
+    def __init__(
+        self,
+        width: int = 600,
+        height: int = 300,
+        theme: Union[Theme, str] = Theme.light,
+    ):
         self.width = width
         self.height = height
-        self.theme = theme
-        # conservative chars-per-line baseline (scaled later)
-        self.base_cpl = 28
+        self.theme: str = theme.value if isinstance(theme, Theme) else theme
+        self.palette: ThemePalette = THEMES[self.theme]
 
     def _escape(self, s: str) -> str:
-        return escape(s, quote=True)
-
-    def _wrap_text(self, text: str, max_width: int, font_size: int = 16) -> list[str]:
-        words = text.split()
-        lines, current_line = [], []
-
-        for word in words:
-            test_line = " ".join(current_line + [word])
-            est_width = len(test_line) * font_size * 0.6
-            if est_width <= max_width:
-                current_line.append(word)
-            else:
-                lines.append(" ".join(current_line))
-                current_line = [word]
+        return _escape(s)
 
-        if current_line:
-            lines.append(" ".join(current_line))
-        return lines
-
-    def convert_to_svg(
+    def render(
         self,
         quote: Quote,
         *,
         padding: int = 40,
         avatar_size: int = 72,
-    ) -> str:
-        text = self._escape(quote.quote.strip())
-        author = self._escape(quote.author.strip()) if quote.author else ""
+        avatar: Optional[str] = None,
+    ) -> bytes:
+        """
+        Renders a quote card as UTF-8 encoded SVG.
+
+        Args:
+            quote (Quote): The quote to render.
+            padding (int): Inner margin of the card, in pixels.
+            avatar_size (int): Diameter of the author's avatar, in pixels.
+            avatar (Optional[str]): The avatar as a `data:` URI. The card is
+                rendered without an avatar when None.
+
+        Returns:
+            bytes: The SVG document.
+        """
 
-        # pick a base font size by heuristic
-        font_size = int(self.width * 0.025)
+        template = compile_template(self.palette, self.width, self.height, padding)
 
         # available width for text (account for avatar + paddings)
         x_text = padding + (avatar_size + 20 if quote.author_avatar_url else 0)
-        available_width = self.width - padding - x_text
-
-        # compute chars-per-line based on width + font size
-        cpl = int(self.base_cpl * (available_width / self.width) * (44 / font_size))
         max_text_width = self.width - x_text - padding
-        lines = self._wrap_text(text, max_text_width, font_size)
-
-        # total block height
-        text_block_height = len(lines) * (font_size * 1.3)
 
-        # 🔹 auto-shrink font size if block too tall
-        while text_block_height > self.height - 2 * padding and font_size > 14:
-            font_size -= 2
-            cpl = int(self.base_cpl * (available_width / self.width) * (44 / font_size))
-            lines = self._wrap_text(text, cpl)
-            text_block_height = len(lines) * (font_size * 1.3)
+        # wrap with real glyph widths, shrinking the font if the block is too tall
+        layout = layout_text(
+            quote.quote.strip(),
+            max_text_width,
+            self.height - 2 * padding,
+            int(self.width * 0.025),
+        )
+        font_size = layout.font_size
+        text_block_height = layout.block_height
 
         # center vertically (but don’t go above top margin)
         top_y = max(padding, (self.height - text_block_height) // 2)
 
-        # theme colors
-        if self.theme == Theme.light:
-            bg = "#ffffff"
-            fg = "#0f1724"
-            accent_from = "#7DD3FC"
-            accent_to = "#60A5FA"
-            author_fg = "#334155"
-
-        if self.theme == Theme.dark:
-            bg = "#0f1724"
-            fg = "#e6eef8"
-            accent_from = "#6EE7B7"
-            accent_to = "#3B82F6"
-            author_fg = "#c9d6e8"
-
-        # Build svg lines as <tspan> elements
-        x_text = padding + (avatar_size + 20 if quote.author_avatar_url else 0)
-        tspan_lines = []
-        for idx, line in enumerate(lines):
-            dy = 0 if idx == 0 else font_size * 1.3
-            tspan_lines.append(f'<tspan x="{x_text}" dy="{dy}">{line}</tspan>')
-
-        # author block (aligned right)
-        author_svg = ""
-        if author:
-            author_y = top_y + text_block_height + 24
-            author_svg = (
-                f'<text x="{self.width - padding}" y="{author_y}" '
-                f'font-family="Inter, -apple-system, system-ui, Roboto, Arial" '
-                f'font-size="{int(font_size * 0.7)}" fill="{author_fg}" text-anchor="end">'
-                f"— {author}"
-                f"</text>"
-            )
+        parts: list[bytes] = [
+            template.head,
+            f"{_escape(quote.quote)} — {_escape(quote.author or '')}".encode("utf-8"),
+            template.body,
+        ]
 
         # avatar svg (optional)
-        avatar_svg = ""
-        if quote.author_avatar_url:
-            resp = requests.get(quote.author_avatar_url, timeout=5)
-            if resp.status_code == 200:
-                b64_avatar = base64.b64encode(resp.content).decode("utf-8")
-                mime_type = resp.headers.get("Content-Type", "image/png")
-
-                avatar_x = padding
-                avatar_y = top_y + (text_block_height - avatar_size) // 2
-                # href = self._escape(str(quote.author_avatar_url))
-                avatar_svg = (
+        if quote.author_avatar_url and avatar:
+            avatar_x = padding
+            avatar_y = top_y + (text_block_height - avatar_size) // 2
+            parts.append(
+                (
                     f"<defs>"
                     f'  <clipPath id="avatar_clip_{quote.id}">'
                     f'    <circle cx="{avatar_x + avatar_size / 2}" cy="{avatar_y + avatar_size / 2}" r="{avatar_size / 2}" />'
                     f"  </clipPath>"
                     f"</defs>"
-                    f'<image href="data:{mime_type};base64,{b64_avatar}" x="{avatar_x}" y="{avatar_y}" width="{avatar_size}" height="{avatar_size}" '
+                    f'<image href="{avatar}" x="{avatar_x}" y="{avatar_y}" width="{avatar_size}" height="{avatar_size}" '
                     f'clip-path="url(#avatar_clip_{quote.id})" preserveAspectRatio="xMidYMid slice" />'
-                )
+                ).encode("utf-8")
+            )
 
-        # assemble SVG
-        svg = f'''<?xml version="1.0" encoding="UTF-8"?>
-<svg xmlns="http://www.w3.org/2000/svg" width="{self.width}" height="{self.height}"
-     viewBox="0 0 {self.width} {self.height}" role="img"
-     aria-label="{self._escape(quote.quote)} — {self._escape(quote.author or "")}">
-  <defs>
-    <linearGradient id="g" x1="0" x2="1" y1="0" y2="1">
-      <stop offset="0%" stop-color="{accent_from}"/>
-      <stop offset="100%" stop-color="{accent_to}"/>
-    </linearGradient>
+        # quote block, one <tspan> per line
+        tspans = "".join(
+            f'<tspan x="{x_text}" dy="{0 if idx == 0 else layout.line_height}">'
+            f"{_escape(line)}</tspan>"
+            for idx, line in enumerate(layout.lines)
+        )
+        parts += [
+            f'\n    <text x="{x_text}" y="{top_y + int(font_size)}'.encode("utf-8"),
+            template.text_attrs,
+            str(font_size).encode("utf-8"),
+            template.text_fill,
+            tspans.encode("utf-8"),
+            b"\n    </text>\n    ",
+        ]
 
-    <filter id="f" x="-20%" y="-20%" width="140%" height="140%">
-      <feDropShadow dx="0" dy="8" stdDeviation="18" flood-color="#000" flood-opacity="0.12"/>
-    </filter>
-  </defs>
+        # author block (aligned right)
+        if quote.author and quote.author.strip():
+            author_y_open, author_size_open, author_text_open = template.author_open
+            parts.append(
+                (
+                    f"{author_y_open}{top_y + text_block_height + 24}"
+                    f"{author_size_open}{int(font_size * 0.7)}"
+                    f"{author_text_open}{_escape(quote.author.strip())}</text>"
+                ).encode("utf-8")
+            )
 
-  <!-- background -->
-  <rect width="100%" height="100%" fill="{bg}" />
+        parts.append(template.tail)
+        # Joining sizes the output buffer once, for the exact total length.
+        return b"".join(parts)
 
-  <!-- gradient card -->
-  <rect x="{padding / 2}" y="{padding / 2}" rx="24" ry="24"
-        width="{self.width - padding}" height="{self.height - padding}"
-        fill="url(#g)" opacity="0.08" filter="url(#f)" />
-
-  <!-- main content -->
-  <g>
-    {avatar_svg}
-    <text x="{x_text}" y="{top_y + int(font_size)}"
-          font-family="Inter, -apple-system, system-ui, Roboto, Arial"
-          font-size="{font_size}" fill="{fg}" font-weight="600">
-      {"".join(tspan_lines)}
-    </text>
-    {author_svg}
-  </g>
-</svg>
-'''
-        return svg
+    def convert_to_svg(
+        self,
+        quote: Quote,
+        *,
+        padding: int = 40,
+        avatar_size: int = 72,
+        avatar: Optional[str] = None,
+    ) -> str:
+        return self.render(
+            quote, padding=padding, avatar_size=avatar_size, avatar=avatar
+        ).decode("utf-8")
@@ -0,0 +1,205 @@
+from dataclasses import dataclass
+from functools import lru_cache
+
+FONT_STACK = "Inter, -apple-system, system-ui, Roboto, Arial"
+LINE_HEIGHT = 1.3
+MIN_FONT_SIZE = 14
+
+# Advance widths, in 1/1000 em, of the printable ASCII characters (U+0020 to
+# U+007E, in order) for Arial, which is metric-compatible with Helvetica and
+# the last font of FONT_STACK that every renderer is guaranteed to resolve.
+# fmt: off
+_ARIAL_REGULAR_ASCII = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,  # space - /
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,  # 0 - ?
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,  # @ - O
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,  # P - _
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,  # ` - o
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,  # p - ~
+)
+_ARIAL_BOLD_ASCII = (
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,  # space - /
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,  # 0 - ?
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,  # @ - O
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,  # P - _
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,  # ` - o
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,  # p - ~
+)
+# fmt: on
+_ARIAL_REGULAR_EXTRA = {
+    "‘": 222,
+    "’": 222,
+    "“": 333,
+    "”": 333,
+    "–": 556,
+    "—": 1000,
+    "…": 1000,
+}
+_ARIAL_BOLD_EXTRA = {
+    "‘": 278,
+    "’": 278,
+    "“": 500,
+    "”": 500,
+    "–": 556,
+    "—": 1000,
+    "…": 1000,
+}
+
+# Inter and San Francisco, which come first in FONT_STACK, set slightly
+# wider than Arial; scaling the Arial metrics keeps lines from overflowing
+# whichever font of the stack the client ends up using.
+_FONT_STACK_SCALE = 1.05
+
+
+class FontMetrics:
+    """
+    Per-character advance widths of a font, used to measure text in pixels
+    without a font rasterizer.
+
+    Characters missing from the table are measured with `default_width`, or
+    as a full em for wide (CJK and later) code points.
+    """
+
+    def __init__(
+        self,
+        widths: dict[str, int],
+        default_width: int = 556,
+        units_per_em: int = 1000,
+        scale: float = 1.0,
+    ) -> None:
+        factor = scale / units_per_em
+        self._em_widths: dict[str, float] = {ch: w * factor for ch, w in widths.items()}
+        self._default_em = default_width * factor
+        self._wide_em = units_per_em * factor
+        # Quotes share most of their vocabulary, so word widths are memoized.
+        self.word_width = lru_cache(maxsize=65536)(self.text_width)
+
+    def char_width(self, ch: str) -> float:
+        """
+        Returns the advance width of a character, in em.
+        """
+
+        width = self._em_widths.get(ch)
+        if width is None:
+            width = self._wide_em if ord(ch) >= 0x2E80 else self._default_em
+        return width
+
+    def text_width(self, text: str, font_size: float = 1) -> float:
+        """
+        Returns the advance width of `text`, in pixels at `font_size`.
+        """
+
+        try:
+            total = sum(map(self._em_widths.__getitem__, text))
+        except KeyError:
+            total = sum(map(self.char_width, text))
+        return total * font_size
+
+
+def _build_metrics(ascii_widths: tuple[int, ...], extra: dict[str, int]) -> FontMetrics:
+    widths = {chr(0x20 + i): w for i, w in enumerate(ascii_widths)}
+    widths.update(extra)
+    return FontMetrics(widths, scale=_FONT_STACK_SCALE)
+
+
+REGULAR_METRICS = _build_metrics(_ARIAL_REGULAR_ASCII, _ARIAL_REGULAR_EXTRA)
+BOLD_METRICS = _build_metrics(_ARIAL_BOLD_ASCII, _ARIAL_BOLD_EXTRA)
+
+
+@dataclass(frozen=True)
+class TextLayout:
+    """
+    The result of laying out a block of text.
+
+    Attributes:
+        lines (tuple[str, ...]): The wrapped lines, unescaped.
+        font_size (int): The chosen font size, in pixels.
+        line_height (float): Distance between two baselines, in pixels.
+    """
+
+    lines: tuple[str, ...]
+    font_size: int
+    line_height: float
+
+    @property
+    def block_height(self) -> float:
+        return len(self.lines) * self.line_height
+
+
+def wrap_words(
+    words: list[str], word_widths: list[float], space_width: float, max_width: float
+) -> list[str]:
+    """
+    Greedily wraps words into lines no wider than `max_width`.
+
+    Runs in linear time: each word's width is measured once up front (in any
+    unit, as long as `space_width` and `max_width` use the same one) and the
+    current line width is kept as a running sum. A word wider than
+    `max_width` is put on a line of its own.
+    """
+
+    lines: list[str] = []
+    start = 0
+    line_width = 0.0
+    for i, width in enumerate(word_widths):
+        if i == start:
+            line_width = width
+        elif line_width + space_width + width <= max_width:
+            line_width += space_width + width
+        else:
+            lines.append(" ".join(words[start:i]))
+            start = i
+            line_width = width
+    if start < len(words):
+        lines.append(" ".join(words[start:]))
+    return lines
+
+
+@lru_cache(maxsize=4096)
+def layout_text(
+    text: str,
+    max_width: float,
+    max_height: float,
+    max_font_size: int,
+    min_font_size: int = MIN_FONT_SIZE,
+    bold: bool = True,
+) -> TextLayout:
+    """
+    Wraps `text` into a `max_width` × `max_height` box, using the largest
+    font size between `min_font_size` and `max_font_size` that fits.
+
+    Word widths are measured once, in em, so that every candidate font size
+    is wrapped in linear time by scaling the box instead of re-measuring.
+    The font size is found by binary search, since a larger size never
+    needs fewer lines. If nothing fits, the smallest size is used.
+
+    Layouts are memoized per set of arguments.
+    """
+
+    metrics = BOLD_METRICS if bold else REGULAR_METRICS
+    words = text.split()
+    word_widths = list(map(metrics.word_width, words))
+    space_width = metrics.char_width(" ")
+    min_font_size = min(min_font_size, max_font_size)
+
+    def wrap(font_size: int) -> list[str]:
+        return wrap_words(words, word_widths, space_width, max_width / font_size)
+
+    lo, hi = min_font_size, max_font_size
+    best_size, best_lines = lo, None
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        lines = wrap(mid)
+        if len(lines) * mid * LINE_HEIGHT <= max_height:
+            best_size, best_lines = mid, lines
+            lo = mid + 1
+        else:
+            hi = mid - 1
+
+    if best_lines is None:
+        best_lines = wrap(best_size)
+    return TextLayout(
+        lines=tuple(best_lines),
+        font_size=best_size,
+        line_height=best_size * LINE_HEIGHT,
+    )
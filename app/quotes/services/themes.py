@@ -0,0 +1,81 @@
+import json
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Union
+
+from ..types import Theme
+
+
+@dataclass(frozen=True)
+class ThemePalette:
+    """
+    Colors of a quote card.
+
+    Attributes:
+        bg (str): Background color.
+        fg (str): Quote text color.
+        accent_from (str): Start color of the card gradient.
+        accent_to (str): End color of the card gradient.
+        author_fg (str): Author text color.
+    """
+
+    bg: str
+    fg: str
+    accent_from: str
+    accent_to: str
+    author_fg: str
+
+
+THEMES: dict[str, ThemePalette] = {
+    Theme.light.value: ThemePalette(
+        bg="#ffffff",
+        fg="#0f1724",
+        accent_from="#7DD3FC",
+        accent_to="#60A5FA",
+        author_fg="#334155",
+    ),
+    Theme.dark.value: ThemePalette(
+        bg="#0f1724",
+        fg="#e6eef8",
+        accent_from="#6EE7B7",
+        accent_to="#3B82F6",
+        author_fg="#c9d6e8",
+    ),
+}
+
+
+def register_theme(name: str, palette: ThemePalette) -> None:
+    """
+    Registers (or replaces) a theme, making it available to the `theme`
+    query parameter of the SVG endpoints.
+    """
+
+    THEMES[name] = palette
+
+
+def load_themes(file_path: Union[str, Path]) -> list[str]:
+    """
+    Registers every theme declared in a JSON file.
+
+    The file maps theme names to palettes, e.g.
+    `{"solarized": {"bg": "#fdf6e3", "fg": "#657b83", ...}}`, with the keys
+    of `ThemePalette`.
+
+    Raises:
+        ValueError: If a palette is missing a color or has unknown keys.
+
+    Returns:
+        list[str]: The names of the registered themes.
+    """
+
+    with open(file_path, "rb") as f:
+        data = json.load(f)
+
+    expected = {field.name for field in fields(ThemePalette)}
+    for name, colors in data.items():
+        if set(colors) != expected:
+            raise ValueError(
+                f"Theme {name!r} must define exactly: {', '.join(sorted(expected))}"
+            )
+        register_theme(name, ThemePalette(**colors))
+    return list(data)
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import time
+from contextlib import suppress
+from typing import Iterator, Optional, Sequence
+
+from fastapi import HTTPException
+
+from ..schemas import Quote
+from .quote_provider import QuoteProvider
+from .renderer import QuoteRenderer
+from .svg_converter import SVGConverter
+from .themes import THEMES
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class CardWarmer:
+    """
+    Pre-renders the SVG cards of every quote in the background, so the first
+    requests after a deploy or a corpus change are served from the cache.
+
+    For each quote, the avatar is fetched first (without the render timeout,
+    so no card is left incomplete) and then a card is rendered for every
+    theme × size of the matrix. At most `concurrency` quotes are warmed at a
+    time. Warming a corpus whose matrix does not fit in `SVG_CACHE_BYTES`
+    only churns the cache.
+
+    The warmer is `ready` once a warm-up has gone through the whole corpus,
+    and stays ready when a later corpus change starts a new one.
+
+    Args:
+        provider (QuoteProvider): The provider whose corpus is warmed.
+        renderer (QuoteRenderer): The renderer whose caches are filled.
+        themes (Sequence[str]): Themes to render. Defaults to every
+            registered theme when the warm-up starts.
+        sizes (Sequence[tuple[int, int]]): `(width, height)` to render.
+        concurrency (int): Quotes warmed concurrently.
+    """
+
+    def __init__(
+        self,
+        provider: QuoteProvider,
+        renderer: QuoteRenderer,
+        themes: Sequence[str] = (),
+        sizes: Sequence[tuple[int, int]] = ((400, 175),),
+        concurrency: int = 8,
+    ) -> None:
+        self.provider = provider
+        self.renderer = renderer
+        self.themes = tuple(themes)
+        self.sizes = tuple(sizes)
+        self.concurrency = concurrency
+        self.ready = False
+        self.total = 0
+        self.done = 0
+        self.failed = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """
+        Starts warming the current corpus, cancelling a warm-up in progress.
+        Must be called from the event loop.
+        """
+
+        if self._task is not None:
+            self._task.cancel()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def converters(self) -> list[SVGConverter]:
+        themes = self.themes or tuple(THEMES)
+        unknown = [theme for theme in themes if theme not in THEMES]
+        if unknown:
+            logger.warning(f"Skipping unknown warm-up themes: {', '.join(unknown)}")
+        return [
+            SVGConverter(width=width, height=height, theme=theme)
+            for theme in themes
+            if theme in THEMES
+            for width, height in self.sizes
+        ]
+
+    async def run(self) -> None:
+        """
+        Warms every card of the current corpus, then marks the warmer ready.
+        """
+
+        corpus = self.provider.corpus
+        converters = self.converters()
+        self.total = len(corpus) * len(converters)
+        self.done = self.failed = 0
+        self.started_at, self.finished_at = time.time(), None
+        quotes = iter(corpus.quotes)
+
+        await asyncio.gather(
+            *(self._worker(quotes, converters) for _ in range(self.concurrency))
+        )
+        self.finished_at = time.time()
+        self.ready = True
+        logger.info(
+            f"Warmed {self.done} cards in {self.finished_at - self.started_at:.1f}s"
+            f" ({self.failed} failed)"
+        )
+
+    async def _worker(
+        self, quotes: Iterator[Quote], converters: list[SVGConverter]
+    ) -> None:
+        # Workers share one iterator, so each quote is warmed exactly once.
+        # A quote that fails is counted and skipped: one bad quote or avatar
+        # must not end the warm-up, which would then never be ready.
+        for quote in quotes:
+            try:
+                if quote.author_avatar_url:
+                    await self.renderer.avatar_store.get(str(quote.author_avatar_url))
+            except Exception as exc:
+                # Its cards are rendered without the avatar, thus incomplete.
+                logger.warning(
+                    f"Failed to warm the avatar of quote {quote.id}: {exc!r}"
+                )
+            for converter in converters:
+                try:
+                    card = await self.renderer.render_svg(quote, converter)
+                except HTTPException:
+                    card = None
+                except Exception as exc:
+                    logger.warning(
+                        f"Failed to warm a card of quote {quote.id}: {exc!r}"
+                    )
+                    card = None
+                if card is None or not card.complete:
+                    self.failed += 1
+                self.done += 1
+
+    def status(self) -> dict:
+        """
+        Returns the progress of the current (or last) warm-up.
+        """
+
+        elapsed = 0.0
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        return {
+            "ready": self.ready,
+            "running": self._task is not None and not self._task.done(),
+            "done": self.done,
+            "failed": self.failed,
+            "total": self.total,
+            "seconds": round(elapsed, 3),
+        }
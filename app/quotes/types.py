@@ -7,8 +7,15 @@ QuoteType: TypeAlias = Literal["inspiration", "practical"]
 class QuoteResponseType(str, Enum):
     json = "json"
     svg = "svg"
+    png = "png"
+    webp = "webp"
 
 
 class Theme(str, Enum):
     light = "light"
     dark = "dark"
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    json = "json"
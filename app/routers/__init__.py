@@ -1,3 +1,5 @@
+from .admin import router as admin_router
 from .health import router as health_router
+from .metrics import router as metrics_router
 
-__all__ = ["health_router"]
+__all__ = ["admin_router", "health_router", "metrics_router"]
@@ -0,0 +1,56 @@
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+
+from app.core.config import get_settings
+from app.exceptions import Forbidden, NotFound
+from app.quotes.dependencies import provide_quote_provider
+from app.quotes.services import QuoteProvider
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+def require_admin_token(
+    x_admin_token: Optional[str] = Header(None, description="Admin token"),
+) -> None:
+    """
+    Dependency guarding the admin endpoints.
+
+    The admin endpoints are hidden (404) unless `ADMIN_TOKEN` is configured,
+    and reject requests whose `X-Admin-Token` header does not match it.
+    """
+
+    admin_token = get_settings().admin_token
+    if not admin_token:
+        raise NotFound()
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, admin_token):
+        raise Forbidden()
+
+
+@router.post("/reload", dependencies=[Depends(require_admin_token)])
+async def reload_quotes(
+    request: Request,
+    quote_provider: QuoteProvider = Depends(provide_quote_provider),
+):
+    """
+    Reloads the quote corpus from the quotes file.
+
+    The new corpus is built in the background and swapped in atomically;
+    requests in flight keep being served from the previous corpus.
+
+    Returns:
+        dict: The number of quotes and the version of the corpus now served.
+
+    Raises:
+        HTTPException: 422 Unprocessable Entity if the quotes file is invalid.
+    """
+
+    try:
+        corpus = await quote_provider.reload()
+    except (OSError, ValueError) as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Invalid quotes file: {exc}",
+        )
+    return {"status": "ok", "quotes": len(corpus), "version": corpus.version}
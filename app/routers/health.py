@@ -1,21 +1,40 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Query, Request, status
+from fastapi.responses import JSONResponse
+
+from app.core.config import get_settings
+from app.quotes.dependencies import get_card_warmer
 
-from app.core.rate_limiter import limiter
 
 router = APIRouter()
 
 
 @router.get("/health", tags=["Health"])
-@limiter.exempt
-async def health_check(request: Request):
+async def health_check(
+    request: Request,
+    require_ready: bool = Query(
+        False, description="Answer 503 until the instance is ready to serve"
+    ),
+):
     """
     Performs a health check on the API.
 
     This endpoint is used to verify that the application is running and able to response to requests. It's a standard practice for monitoring and load balancing.
 
+    With `WARMUP` enabled, the instance is not `ready` until the SVG cards of
+    the whole corpus are pre-rendered, and the progress is reported under
+    `warmup`. Load balancers can pass `require_ready=true` to get a
+    `503 Service Unavailable` until then.
+
     Returns:
         dict: A dictionary with the status of the API.
-            Example: {"status": "ok"}
+            Example: {"status": "ok", "ready": true}
     """
 
-    return {"status": "ok"}
+    if not get_settings().warmup:
+        return {"status": "ok", "ready": True}
+
+    warmup = get_card_warmer().status()
+    body = {"status": "ok", "ready": warmup.pop("ready"), "warmup": warmup}
+    if require_ready and not body["ready"]:
+        return JSONResponse(body, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return body
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Request, Response
+
+from app.core.metrics import render_metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", tags=["Health"], include_in_schema=False)
+async def metrics(request: Request):
+    """
+    Exposes the application metrics in the Prometheus text format.
+
+    Request counts and latencies per route and response type, render and
+    avatar fetch latencies, cache lookups, corpus size and load time, and
+    rate-limit rejections. With `PROMETHEUS_MULTIPROC_DIR` set, the metrics
+    of every uvicorn worker are aggregated, whichever worker serves the
+    scrape.
+    """
+
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
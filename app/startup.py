@@ -0,0 +1,46 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class StartupProfile:
+    """
+    Times the components of a worker's startup: the imports done by the app
+    factory, then the initialization done by the lifespan.
+
+    This module only imports the standard library, so that it can time the
+    imports of everything else. Steps are always timed, which costs nothing
+    measurable, as the settings telling whether to report them
+    (`STARTUP_PROFILE`) are themselves imported in a step; `report` logs
+    them only once `enabled` is set.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.steps: list[tuple[str, float]] = []
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((name, time.perf_counter() - start))
+
+    @property
+    def total(self) -> float:
+        return sum(duration for _, duration in self.steps)
+
+    def format(self) -> str:
+        width = max((len(name) for name, _ in self.steps), default=0)
+        lines = [f"Startup profile: {self.total * 1000:.1f} ms"]
+        for name, duration in self.steps:
+            lines.append(f"  {name:<{width}}  {duration * 1000:>8.1f} ms")
+        return "\n".join(lines)
+
+    def report(self) -> None:
+        if self.enabled:
+            logger.info(self.format())
@@ -0,0 +1,127 @@
+"""
+Load benchmark of the access log middleware overhead, in microseconds per
+request.
+
+A bare Starlette app answering `GET /` is driven directly through its ASGI
+interface, without and with each middleware: "legacy" is the previous
+`BaseHTTPMiddleware` logger (reads the body, formats f-strings on the event
+loop, `uuid4` per request), "access log" is `AccessLogMiddleware` writing
+JSON lines through the queue listener, fully and at 10% sampling. Log lines
+go to /dev/null. Run with:
+
+    python -m benchmarks.bench_access_log
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import logging
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import Response
+from starlette.routing import Route
+
+from app.core import AccessLogMiddleware, configure_access_log
+
+REQUESTS = 20_000
+CONCURRENCY = 50
+
+legacy_logger = logging.getLogger("bench.legacy")
+
+
+class LegacyLoggingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        request_id = str(uuid.uuid4())
+        start_time = time.time()
+        client_host = request.client.host if request.client else "unknown"
+        user_agent = request.headers.get("user-agent", "-")
+        body = await request.body()
+        body_size = len(body) if body else 0
+        legacy_logger.info(
+            f"➡️ [{request_id}] {request.method} {request.url.path}"
+            f" | IP: {client_host} | User Agent: {user_agent}"
+            f" | Query: {dict(request.query_params)}"
+            f" | Size: {body_size} bytes"
+        )
+        response = await call_next(request)
+        duration = (time.time() - start_time) * 1000
+        legacy_logger.info(
+            f"⬅️ [{request_id}] {request.method} {request.url.path}"
+            f" | Status: {response.status_code} | Time: {duration:.2f} ms"
+        )
+        response.headers["X-Request-ID"] = request_id
+        return response
+
+
+async def homepage(request):
+    return Response(b'{"status":"ok"}', media_type="application/json")
+
+
+def make_app(*middleware: Middleware) -> Starlette:
+    return Starlette(routes=[Route("/", homepage)], middleware=list(middleware))
+
+
+SCOPE = {
+    "type": "http",
+    "asgi": {"version": "3.0"},
+    "http_version": "1.1",
+    "method": "GET",
+    "scheme": "http",
+    "path": "/",
+    "raw_path": b"/",
+    "root_path": "",
+    "query_string": b"quote_type=inspiration",
+    "headers": [(b"host", b"testserver"), (b"user-agent", b"bench")],
+    "client": ("127.0.0.1", 50000),
+    "server": ("testserver", 80),
+}
+
+
+async def drive(app, requests: int) -> None:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(requests):
+        await app(dict(SCOPE), receive, send)
+
+
+async def microseconds_per_request(app) -> float:
+    per_worker = REQUESTS // CONCURRENCY
+    await drive(app, per_worker)  # warm-up
+    start = time.perf_counter()
+    await asyncio.gather(*(drive(app, per_worker) for _ in range(CONCURRENCY)))
+    return (time.perf_counter() - start) / (per_worker * CONCURRENCY) * 1e6
+
+
+async def main() -> None:
+    devnull = open(os.devnull, "w")
+    legacy_logger.addHandler(logging.StreamHandler(devnull))
+    legacy_logger.setLevel(logging.INFO)
+    legacy_logger.propagate = False
+    listener = configure_access_log(logging.StreamHandler(devnull))
+
+    baseline = await microseconds_per_request(make_app())
+    print(f"{'no middleware':>20} | {baseline:7.1f} us/request")
+    for name, middleware in (
+        ("legacy", Middleware(LegacyLoggingMiddleware)),
+        ("access log", Middleware(AccessLogMiddleware)),
+        ("access log 10%", Middleware(AccessLogMiddleware, sample_rate=0.1)),
+    ):
+        elapsed = await microseconds_per_request(make_app(middleware))
+        print(
+            f"{name:>20} | {elapsed:7.1f} us/request"
+            f" | overhead {elapsed - baseline:6.1f} us"
+        )
+
+    listener.stop()
+    devnull.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+"""
+Benchmark of avatar processing: SVG card size and render time with the
+original avatar embedded ("before") and with the cropped, downscaled and
+re-encoded variants ("after").
+
+The avatar is a generated 600x600 JPEG, like the photos of the bundled
+quotes. Requires Pillow. Run with:
+
+    python -m benchmarks.bench_avatar
+"""
+
+import io
+import time
+
+from PIL import Image, ImageDraw, ImageFilter
+
+from app.quotes.schemas import Quote
+from app.quotes.services import SVGConverter
+from app.quotes.services.avatar_processing import (
+    AVATAR_SIZE,
+    data_uri,
+    output_format,
+    process_avatar,
+)
+
+QUOTE = Quote(
+    id=1,
+    quote="If you would be wealthy, think of saving as well as getting.",
+    author="Benjamin Franklin",
+    author_avatar_url="https://example.com/franklin.jpg",
+    type="inspiration",
+)
+
+
+def photo_jpeg(side: int = 600) -> bytes:
+    noise = Image.effect_noise((side, side), 48).convert("RGB")
+    image = Image.merge(
+        "RGB",
+        (
+            Image.linear_gradient("L").resize((side, side)),
+            Image.radial_gradient("L").resize((side, side)),
+            noise.getchannel(0),
+        ),
+    )
+    ImageDraw.Draw(image).ellipse((150, 80, 450, 420), fill=(210, 170, 140))
+    image = image.filter(ImageFilter.GaussianBlur(1))
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=90)
+    return output.getvalue()
+
+
+def render_us(avatar: str, count: int = 2000) -> float:
+    converter = SVGConverter(width=600, height=300)
+    start = time.perf_counter()
+    for _ in range(count):
+        converter.render(QUOTE, avatar=avatar)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main() -> None:
+    jpeg = photo_jpeg()
+    start = time.perf_counter()
+    variants = process_avatar(jpeg, (AVATAR_SIZE, 2 * AVATAR_SIZE))
+    processing_ms = (time.perf_counter() - start) * 1e3
+    print(f"source: 600x600 JPEG, {len(jpeg)} bytes")
+    print(f"processing (once per avatar, {output_format()}): {processing_ms:.1f} ms")
+
+    before = data_uri(jpeg, "image/jpeg")
+    base_size = len(SVGConverter(width=600, height=300).render(QUOTE, avatar=before))
+    base_us = render_us(before)
+    print(f"{'avatar':>12} | {'svg bytes':>10} | {'render us':>9}")
+    print(f"{'original':>12} | {base_size:>10} | {base_us:>9.1f}")
+    for scale, avatar in enumerate(variants, start=1):
+        size = len(SVGConverter(width=600, height=300).render(QUOTE, avatar=avatar))
+        us = render_us(avatar)
+        print(
+            f"{f'{AVATAR_SIZE * scale}px ({scale}x)':>12} | {size:>10} | {us:>9.1f}"
+            f" | {size / base_size:.1%} of the bytes, x{base_us / us:.1f} faster"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark of corpus loading: startup time and memory of a worker serving a
+JSON quotes file ("json", parsed, validated and compiled at startup) and
+the same quotes compiled ahead of time ("compiled", memory-mapped).
+
+Each measurement runs in a fresh process, which loads the corpus and then
+serves random quotes by ID. Memory is reported as the growth of the
+resident set (RSS) and of its anonymous part, private to the process:
+the rest are pages of the mapped file, shared by every worker of the host
+and reclaimable by the kernel. Run with:
+
+    python -m benchmarks.bench_corpus
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app.quotes.services.corpus import compile_corpus, load_json_quotes
+
+from .suite import write_corpus
+
+CHILD = """
+import json, random, sys, time
+
+from app.quotes.services import QuoteCorpus
+
+def memory():
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if value.strip().endswith("kB"):
+                fields[name] = int(value.split()[0]) / 1024
+    return fields["Rss"], fields["Anonymous"]
+
+LOOKUPS = int(sys.argv[2])
+base_rss, base_anon = memory()
+start = time.perf_counter()
+corpus = QuoteCorpus.from_file(sys.argv[1])
+load = time.perf_counter() - start
+rss, anon = memory()
+ids = corpus.ids
+start = time.perf_counter()
+for _ in range(LOOKUPS):
+    quote = corpus.get(ids[random.randrange(len(ids))])
+    corpus.encoded(quote)
+lookup = (time.perf_counter() - start) / LOOKUPS
+served_rss, served_anon = memory()
+print(json.dumps({
+    "load": load, "rss": rss - base_rss, "anon": anon - base_anon,
+    "served_rss": served_rss - base_rss,
+    "served_anon": served_anon - base_anon, "lookup": lookup,
+}))
+"""
+
+
+def measure(path: Path, lookups: int) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, str(path), str(lookups)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes",
+        type=lambda s: tuple(int(n) for n in s.split(",")),
+        default=(10_000, 1_000_000),
+    )
+    parser.add_argument("--lookups", type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(
+        f"{'corpus':>18} | {'file MB':>7} | {'load s':>7} | {'RSS MB':>7}"
+        f" | {'anon MB':>10} | {'after lookups RSS/anon MB':>28}"
+        f" | {'lookup us':>9}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            source = Path(tmp) / f"quotes-{size}.json"
+            compiled = source.with_suffix(".qcorpus")
+            write_corpus(source, size, "http://127.0.0.1/avatars")
+            start = time.perf_counter()
+            quotes, version, _ = load_json_quotes(source)
+            compiled.write_bytes(compile_corpus(quotes, version))
+            del quotes
+            print(f"compiled n={size} in {time.perf_counter() - start:.1f}s")
+
+            for name, path in (("json", source), ("compiled", compiled)):
+                r = measure(path, args.lookups)
+                after = f"{r['served_rss']:.1f} / {r['served_anon']:.1f}"
+                print(
+                    f"{f'{name} n={size}':>18} | {path.stat().st_size / 2**20:>7.1f}"
+                    f" | {r['load']:>7.3f} | {r['rss']:>7.1f} | {r['anon']:>10.1f}"
+                    f" | {after:>28} | {r['lookup'] * 1e6:>9.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
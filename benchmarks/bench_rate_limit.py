@@ -0,0 +1,94 @@
+"""
+Flood benchmark of the rate-limit rejection path, in requests per second.
+
+A FastAPI app with one rate-limited route is driven directly through its
+ASGI interface by a single client whose limit is exhausted, so every
+request is rejected with a 429. "allowed" is the same route with a limit
+high enough to never reject, for reference. Both in-process storages are
+measured. Run with:
+
+    python -m benchmarks.bench_rate_limit
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+from fastapi import FastAPI, Request
+
+from app.core.rate_limiter import RateLimiter, RateLimitMiddleware
+
+REQUESTS = 20_000
+CONCURRENCY = 50
+
+SCOPE = {
+    "type": "http",
+    "asgi": {"version": "3.0"},
+    "http_version": "1.1",
+    "method": "GET",
+    "scheme": "http",
+    "path": "/api/quotes/1",
+    "raw_path": b"/api/quotes/1",
+    "root_path": "",
+    "query_string": b"",
+    "headers": [(b"host", b"testserver"), (b"user-agent", b"bench")],
+    "client": ("127.0.0.1", 50000),
+    "server": ("testserver", 80),
+}
+
+
+def make_app(limiter: RateLimiter, limits: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/quotes/{id}")
+    @limiter.limit(limits)
+    def get_quote(request: Request, id: int):
+        return {"id": id}
+
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
+    return app
+
+
+async def drive(app, requests: int, statuses: list[int]) -> None:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    for _ in range(requests):
+        await app(dict(SCOPE), receive, send)
+
+
+async def requests_per_second(app) -> tuple[float, set[int]]:
+    statuses: list[int] = []
+    per_worker = REQUESTS // CONCURRENCY
+    await drive(app, per_worker, [])  # warm-up, exhausts low limits
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(drive(app, per_worker, statuses) for _ in range(CONCURRENCY))
+    )
+    elapsed = time.perf_counter() - start
+    return per_worker * CONCURRENCY / elapsed, set(statuses)
+
+
+async def main() -> None:
+    shm_path = os.path.join(tempfile.mkdtemp(), "bench.ratelimit")
+    for storage in ("memory://", f"shm://{shm_path}"):
+        for name, limits in (
+            ("rejected", "10 per minute"),
+            ("allowed", "1000000 per minute"),
+        ):
+            limiter = RateLimiter()
+            limiter.setup(storage, "sliding-window-counter")
+            rate, statuses = await requests_per_second(make_app(limiter, limits))
+            print(
+                f"{storage.split(':')[0]:>6} | {name:>8} | {rate:>8.0f} req/s"
+                f" | statuses {sorted(statuses)}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+"""
+Benchmark of worker startup: the time from process start until a worker has
+run its lifespan and can serve requests.
+
+"cold" workers are fresh interpreters importing the app, as with
+`uvicorn --workers`; "preloaded" workers are forked from a process that
+already imported it, as with `gunicorn --preload`, and only run the
+lifespan. Both serve the bundled quotes file, then a compiled copy of it.
+Run with:
+
+    python -m benchmarks.bench_startup
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app.core.config import DEFAULT_QUOTES_FILE
+from app.quotes.services.corpus import compile_corpus, load_json_quotes
+
+CHILD = """
+import asyncio, os, sys, time
+
+start = float(sys.argv[1])
+from app.main import app
+
+async def serve():
+    async with app.router.lifespan_context(app):
+        return time.time() - start
+
+if sys.argv[2] == "cold":
+    print(asyncio.run(serve()))
+else:
+    for _ in range(int(sys.argv[3])):
+        start = time.time()
+        pid = os.fork()
+        if pid == 0:
+            print(asyncio.run(serve()), flush=True)
+            os._exit(0)
+        os.waitpid(pid, 0)
+"""
+
+
+def measure(mode: str, quotes_file: Path, runs: int) -> list[float]:
+    env = {**os.environ, "QUOTES_FILE": str(quotes_file), "ACCESS_LOG": "false"}
+    if mode == "cold":
+        return [
+            float(
+                subprocess.run(
+                    [sys.executable, "-c", CHILD, str(time.time()), mode],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                    env=env,
+                ).stdout
+            )
+            for _ in range(runs)
+        ]
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, str(time.time()), mode, str(runs)],
+        check=True,
+        capture_output=True,
+        text=True,
+        env=env,
+    ).stdout
+    return [float(line) for line in output.split()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'workers':>30} | {'p50 ms':>8} | {'max ms':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        compiled = Path(tmp) / "quotes.qcorpus"
+        quotes, version, _ = load_json_quotes(DEFAULT_QUOTES_FILE)
+        compiled.write_bytes(compile_corpus(quotes, version))
+
+        for mode in ("cold", "preloaded"):
+            for name, path in (("json", DEFAULT_QUOTES_FILE), ("compiled", compiled)):
+                times = measure(mode, path, args.runs)
+                print(
+                    f"{f'{mode}, {name} corpus':>30}"
+                    f" | {statistics.median(times) * 1000:>8.1f}"
+                    f" | {max(times) * 1000:>8.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
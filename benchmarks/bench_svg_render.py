@@ -0,0 +1,53 @@
+"""
+Micro-benchmark of SVG card rendering, in renders per second.
+
+"before" compiles the card template on every render, which is the work the
+previous f-string renderer repeated for each call; "after" uses the
+compiled template cache. Text layout is memoized in both cases. Run with:
+
+    python -m benchmarks.bench_svg_render
+"""
+
+import time
+
+from app.quotes.schemas import Quote
+from app.quotes.services import SVGConverter, svg_converter
+
+AVATAR = "data:image/png;base64," + "A" * 4096
+QUOTE = Quote(
+    id=1,
+    quote="If you would be wealthy, think of saving as well as getting.",
+    author="Benjamin Franklin",
+    author_avatar_url="https://example.com/franklin.png",
+    type="inspiration",
+)
+
+
+def renders_per_second(converter: SVGConverter, seconds: float = 1.0) -> float:
+    count = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            converter.render(QUOTE, avatar=AVATAR)
+        count += 100
+    return count / (time.perf_counter() - start)
+
+
+def main() -> None:
+    compile_template = svg_converter.compile_template
+    for theme in ("light", "dark"):
+        for width, height in ((400, 175), (600, 300)):
+            converter = SVGConverter(width=width, height=height, theme=theme)
+            svg_converter.compile_template = compile_template.__wrapped__
+            before = renders_per_second(converter)
+            svg_converter.compile_template = compile_template
+            after = renders_per_second(converter)
+            print(
+                f"{theme:>5} {width}x{height} | before {before:>9.0f} renders/s"
+                f" | after {after:>9.0f} renders/s | x{after / before:.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Micro-benchmark of the SVG text layout.
+
+Compares `layout_text` against the previous character-count wrapping
+algorithm on quotes of increasing length. Run with:
+
+    python -m benchmarks.bench_text_layout
+"""
+
+import timeit
+
+from app.quotes.services.text_layout import layout_text
+
+WORDS = (
+    "Do not save what is left after spending; instead spend what is left "
+    "after saving. Beware of little expenses, a small leak will sink a great ship."
+).split()
+
+
+def legacy_wrap_text(text: str, max_width: int, font_size: int = 16) -> list[str]:
+    # The original SVGConverter._wrap_text, kept here as the baseline.
+    words = text.split()
+    lines, current_line = [], []
+    for word in words:
+        test_line = " ".join(current_line + [word])
+        est_width = len(test_line) * font_size * 0.6
+        if est_width <= max_width:
+            current_line.append(word)
+        else:
+            lines.append(" ".join(current_line))
+            current_line = [word]
+    if current_line:
+        lines.append(" ".join(current_line))
+    return lines
+
+
+def legacy_layout(text: str, max_width: int, max_height: int, font_size: int):
+    lines = legacy_wrap_text(text, max_width, font_size)
+    while len(lines) * font_size * 1.3 > max_height and font_size > 14:
+        font_size -= 2
+        lines = legacy_wrap_text(text, max_width, font_size)
+    return lines
+
+
+def make_quote(n_words: int) -> str:
+    return " ".join(WORDS[i % len(WORDS)] for i in range(n_words))
+
+
+def bench(n_words: int, number: int) -> None:
+    text = make_quote(n_words)
+    # Text box of the largest card: 600x300 with an avatar.
+    args = (text, 428, 220, 15)
+
+    legacy = timeit.timeit(lambda: legacy_layout(*args), number=number)
+    uncached = timeit.timeit(lambda: layout_text.__wrapped__(*args), number=number)
+    layout_text(*args)
+    cached = timeit.timeit(lambda: layout_text(*args), number=number)
+
+    print(
+        f"{n_words:>6} words | legacy {legacy / number * 1e6:>10.1f} us"
+        f" | layout {uncached / number * 1e6:>10.1f} us"
+        f" | memoized {cached / number * 1e6:>6.2f} us"
+    )
+
+
+if __name__ == "__main__":
+    for n_words, number in ((20, 2000), (100, 500), (500, 50), (2000, 10)):
+        bench(n_words, number)
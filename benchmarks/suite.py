@@ -0,0 +1,337 @@
+"""
+Offline benchmark suite of the API, with a regression gate.
+
+Every scenario runs in-process, without network access:
+- the HTTP scenarios call the ASGI app directly, with its lifespan, over a
+  corpus whose avatar URLs point at a local stub server;
+- the QuoteProvider scenarios build providers from generated corpora of
+  6, 10k and 1M quotes and time their construction, lookups and searches.
+
+Each scenario reports p50/p99 latency and requests (or operations) per
+second. Results can be saved as a baseline, and a later run compared
+against it: the run fails when a scenario's throughput drops, or its p50
+latency grows, by more than `--max-regression` percent. Run with:
+
+    python -m benchmarks.suite --save baseline.json
+    python -m benchmarks.suite --baseline baseline.json --max-regression 20
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Optional
+
+# A 1x1 transparent PNG.
+AVATAR_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA"
+    "60e6kgAAAABJRU5ErkJggg=="
+)
+CORPUS_SIZES = (6, 10_000, 1_000_000)
+MIN_SIZE = (400, 175)
+MAX_SIZE = (600, 300)
+
+
+@dataclass
+class Result:
+    name: str
+    p50_us: float
+    p99_us: float
+    rps: float
+    samples: int
+
+
+def summarize(name: str, latencies_ns: list[int], elapsed: float) -> Result:
+    latencies = sorted(latencies_ns)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return Result(
+        name=name,
+        p50_us=statistics.median(latencies) / 1e3,
+        p99_us=p99 / 1e3,
+        rps=len(latencies) / elapsed,
+        samples=len(latencies),
+    )
+
+
+class _AvatarHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(AVATAR_PNG)))
+        self.end_headers()
+        self.wfile.write(AVATAR_PNG)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def start_avatar_server() -> tuple[ThreadingHTTPServer, str]:
+    """
+    Starts a local HTTP server answering every GET with a PNG avatar, and
+    returns it with its base URL.
+    """
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _AvatarHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def write_corpus(path: Path, size: int, avatar_base: str) -> None:
+    """
+    Writes a quotes file of `size` generated quotes, alternating types, with
+    avatars served by the stub server.
+    """
+
+    quotes = [
+        {
+            "id": i,
+            "quote": f"Quote number {i}: do not save what is left after spending, "
+            f"but spend what is left after saving.",
+            "author": f"Author {i % 1000}",
+            "author_avatar_url": f"{avatar_base}/avatars/{i % 50}.png",
+            "type": "inspiration" if i % 2 else "practical",
+        }
+        for i in range(1, size + 1)
+    ]
+    path.write_text(json.dumps(quotes), encoding="utf-8")
+
+
+async def _drive_asgi(
+    app, path: str, query: bytes, count: int, latencies: list[int]
+) -> None:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query,
+        "headers": [(b"host", b"testserver"), (b"user-agent", b"bench")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    statuses = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    for _ in range(count):
+        start = time.perf_counter_ns()
+        await app(dict(scope), receive, send)
+        latencies.append(time.perf_counter_ns() - start)
+    if any(status != 200 for status in statuses):
+        raise RuntimeError(f"{path}?{query.decode()} answered {set(statuses)}")
+
+
+async def bench_http(
+    app, name: str, path: str, query: str, requests: int, concurrency: int
+) -> Result:
+    per_worker = max(1, requests // concurrency)
+    await _drive_asgi(app, path, query.encode(), 10, [])  # warm-up
+    latencies: list[int] = []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            _drive_asgi(app, path, query.encode(), per_worker, latencies)
+            for _ in range(concurrency)
+        )
+    )
+    return summarize(name, latencies, time.perf_counter() - start)
+
+
+def http_scenarios() -> list[tuple[str, str, str]]:
+    scenarios = [
+        ("random json", "/api/quotes/random", ""),
+        ("by id json", "/api/quotes/1", ""),
+        ("search json", "/api/quotes/search", "q=spend+sav&limit=20"),
+    ]
+    for theme in ("light", "dark"):
+        for width, height in (MIN_SIZE, MAX_SIZE):
+            query = f"response_type=svg&theme={theme}&width={width}&height={height}"
+            scenarios.append(
+                (f"random svg {theme} {width}x{height}", "/api/quotes/random", query)
+            )
+            scenarios.append(
+                (f"by id svg {theme} {width}x{height}", "/api/quotes/1", query)
+            )
+    return scenarios
+
+
+async def run_http(requests: int, concurrency: int) -> list[Result]:
+    from app.main import app
+
+    results = []
+    async with app.router.lifespan_context(app):
+        for name, path, query in http_scenarios():
+            results.append(
+                await bench_http(app, name, path, query, requests, concurrency)
+            )
+    return results
+
+
+def bench_calls(name: str, fn: Callable[[], object], count: int) -> Result:
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(count):
+        t = time.perf_counter_ns()
+        fn()
+        latencies.append(time.perf_counter_ns() - t)
+    return summarize(name, latencies, time.perf_counter() - start)
+
+
+def run_provider(corpus_dir: Path, sizes: tuple[int, ...], lookups: int):
+    from app.quotes.services import QuoteProvider
+
+    results = []
+    for size in sizes:
+        path = corpus_dir / f"quotes-{size}.json"
+        builds = 5 if size <= 10_000 else 1
+        results.append(
+            bench_calls(
+                f"provider build n={size}",
+                lambda: QuoteProvider(file_path=path),
+                builds,
+            )
+        )
+        provider = QuoteProvider(file_path=path)
+        ids = [random.randint(1, size) for _ in range(lookups)]
+        it = iter(ids)
+        results.append(
+            bench_calls(
+                f"provider by id n={size}",
+                lambda: provider.get_quote_by_id(next(it)),
+                lookups,
+            )
+        )
+        results.append(
+            bench_calls(
+                f"provider random n={size}",
+                lambda: provider.get_random_quote("practical"),
+                lookups,
+            )
+        )
+        # A mix of common, prefix, rare and author queries.
+        searches = [
+            {"text": "spend saving"},
+            {"text": "sp"},
+            {"text": f"{random.randint(1, size)} number"},
+            {"author": random.choice(provider.quotes).author},
+        ]
+        queries = iter(searches * (lookups // len(searches) + 1))
+        results.append(
+            bench_calls(
+                f"provider search n={size}",
+                lambda: provider.search_quotes(**next(queries)),
+                lookups,
+            )
+        )
+        authors = iter([random.choice(provider.quotes).author for _ in range(lookups)])
+        results.append(
+            bench_calls(
+                f"provider random author n={size}",
+                lambda: provider.get_random_quote(author=next(authors)),
+                lookups,
+            )
+        )
+    return results
+
+
+def compare(
+    results: list[Result], baseline: dict[str, dict], max_regression: float
+) -> list[str]:
+    """
+    Returns a description of every scenario that regressed by more than
+    `max_regression` percent against `baseline`.
+    """
+
+    regressions = []
+    for result in results:
+        base = baseline.get(result.name)
+        if base is None:
+            continue
+        rps_drop = (1 - result.rps / base["rps"]) * 100
+        p50_growth = (result.p50_us / max(base["p50_us"], 1e-3) - 1) * 100
+        if rps_drop > max_regression:
+            regressions.append(
+                f"{result.name}: {result.rps:.0f} req/s, {rps_drop:.0f}% below"
+                f" baseline {base['rps']:.0f}"
+            )
+        elif p50_growth > max_regression:
+            regressions.append(
+                f"{result.name}: p50 {result.p50_us:.1f} us, {p50_growth:.0f}% above"
+                f" baseline {base['p50_us']:.1f}"
+            )
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument(
+        "--sizes",
+        type=lambda s: tuple(int(n) for n in s.split(",")),
+        default=CORPUS_SIZES,
+        help="comma-separated corpus sizes of the QuoteProvider scenarios",
+    )
+    parser.add_argument("--save", type=Path, help="write the results as a baseline")
+    parser.add_argument("--baseline", type=Path, help="baseline to compare with")
+    parser.add_argument("--max-regression", type=float, default=20.0)
+    args = parser.parse_args(argv)
+
+    server, avatar_base = start_avatar_server()
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus_dir = Path(tmp)
+        write_corpus(corpus_dir / "quotes.json", 6, avatar_base)
+        for size in args.sizes:
+            write_corpus(corpus_dir / f"quotes-{size}.json", size, avatar_base)
+
+        # Settings are read on first use, so this must precede app imports.
+        os.environ["QUOTES_FILE"] = str(corpus_dir / "quotes.json")
+        os.environ["RATE_LIMITS"] = "1000000000 per minute"
+        os.environ["ACCESS_LOG"] = "false"
+
+        results = asyncio.run(run_http(args.requests, args.concurrency))
+        results += run_provider(corpus_dir, args.sizes, args.lookups)
+    server.shutdown()
+
+    print(f"{'scenario':<34} {'p50 us':>10} {'p99 us':>10} {'req/s':>10}")
+    for r in results:
+        print(f"{r.name:<34} {r.p50_us:>10.1f} {r.p99_us:>10.1f} {r.rps:>10.1f}")
+
+    if args.save:
+        args.save.write_text(
+            json.dumps({r.name: asdict(r) for r in results}, indent=2) + "\n"
+        )
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print(f"\nRegressed by more than {args.max_regression:g}%:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regression above {args.max_regression:g}%.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
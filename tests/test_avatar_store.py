@@ -0,0 +1,90 @@
+import asyncio
+import base64
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+import pytest
+
+from app.quotes.services import AvatarStore
+
+AVATAR_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA"
+    "60e6kgAAAABJRU5ErkJggg=="
+)
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    Serves a PNG avatar on every GET, slowly enough for concurrent requests
+    to overlap, and counts the requests per path.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _AvatarHandler)
+        self.requests: dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _AvatarHandler(BaseHTTPRequestHandler):
+    server: StubServer
+
+    def do_GET(self) -> None:
+        with self.server.lock:
+            self.server.requests[self.path] = self.server.requests.get(self.path, 0) + 1
+        time.sleep(0.05)
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(AVATAR_PNG)))
+        self.end_headers()
+        self.wfile.write(AVATAR_PNG)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def stub_server() -> Iterator[StubServer]:
+    server = StubServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_concurrent_gets_fetch_each_url_once(stub_server: StubServer) -> None:
+    urls = [f"{stub_server.base_url}/avatars/{i}.png" for i in range(3)]
+
+    async def run() -> list:
+        store = AvatarStore()
+        try:
+            return await asyncio.gather(
+                *(store.get(url) for url in urls for _ in range(20))
+            )
+        finally:
+            await store.aclose()
+
+    avatars = asyncio.run(run())
+
+    assert stub_server.requests == {f"/avatars/{i}.png": 1 for i in range(3)}
+    assert all(avatar and avatar.startswith("data:image/") for avatar in avatars)
+
+
+def test_invalid_url_is_a_missing_avatar() -> None:
+    async def run() -> tuple:
+        store = AvatarStore()
+        try:
+            # httpx raises InvalidURL, which is not an HTTPError.
+            first = await store.get("http://a\x00b/avatar.png")
+            second = await store.get("http://a\x00b/avatar.png")
+            return first, second, store.fetches
+        finally:
+            await store.aclose()
+
+    # Cached as missing: the second call does not try again.
+    assert asyncio.run(run()) == (None, None, 1)
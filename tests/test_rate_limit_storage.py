@@ -0,0 +1,106 @@
+import multiprocessing
+from pathlib import Path
+
+import pytest
+from limits import parse
+
+from app.core.rate_limit_storage import SharedMemoryStorage
+from app.core.rate_limiter import RateLimiter
+
+LIMIT = "500 per minute"
+HITS_PER_WORKER = 400
+
+
+def _hit_from_worker(uri: str, strategy: str, barrier, results) -> None:
+    limiter = RateLimiter()
+    limiter.setup(uri, strategy)
+    item = parse(LIMIT)
+    barrier.wait()
+    results.put(
+        sum(
+            limiter.strategy.hit(item, "client", "/api/quotes")
+            for _ in range(HITS_PER_WORKER)
+        )
+    )
+
+
+@pytest.mark.parametrize("strategy", ["fixed-window", "sliding-window-counter"])
+def test_shared_memory_limit_holds_across_processes(
+    tmp_path: Path, strategy: str
+) -> None:
+    uri = f"shm://{tmp_path / 'ratelimit'}?slots=64"
+    context = multiprocessing.get_context("spawn")
+    barrier, results = context.Barrier(2), context.Queue()
+    workers = [
+        context.Process(target=_hit_from_worker, args=(uri, strategy, barrier, results))
+        for _ in range(2)
+    ]
+    for worker in workers:
+        worker.start()
+    allowed = [results.get(timeout=30) for _ in workers]
+    for worker in workers:
+        worker.join(timeout=30)
+        assert worker.exitcode == 0
+
+    # 800 hits between two workers, of which exactly the limit is allowed.
+    assert sum(allowed) == 500
+
+
+def test_shared_memory_full_table_evicts_soonest_to_expire(tmp_path: Path) -> None:
+    storage = SharedMemoryStorage(f"shm://{tmp_path / 'ratelimit'}?slots=4")
+    for i in range(4):
+        assert storage.incr(f"key-{i}", expiry=10 + i) == 1
+    storage.incr("key-3", expiry=13)
+
+    # No free slot: "key-0", which expires first, gives up its slot.
+    assert storage.incr("key-4", expiry=60) == 1
+    assert storage.get("key-0") == 0
+    assert [storage.get(f"key-{i}") for i in range(1, 5)] == [1, 1, 2, 1]
+
+
+def test_shared_memory_reuses_expired_slots(tmp_path: Path) -> None:
+    storage = SharedMemoryStorage(f"shm://{tmp_path / 'ratelimit'}?slots=2")
+    storage.incr("stale", expiry=-1)
+    storage.incr("live", expiry=60)
+
+    assert storage.incr("new", expiry=60) == 1
+    assert storage.get("live") == 1
+    assert storage.get("stale") == 0
+
+
+@pytest.fixture
+def redis_uri(monkeypatch: pytest.MonkeyPatch) -> str:
+    fakeredis = pytest.importorskip("fakeredis")
+    redis = pytest.importorskip("redis")
+    server = fakeredis.FakeServer()
+    # `limits` opens its clients with `redis.from_url`: every client it opens
+    # talks to the same in-process server instead.
+    monkeypatch.setattr(
+        redis,
+        "from_url",
+        lambda uri, **options: fakeredis.FakeRedis.from_url(
+            uri, server=server, **options
+        ),
+    )
+    return "redis://localhost:6379"
+
+
+@pytest.mark.parametrize(
+    "strategy", ["fixed-window", "moving-window", "sliding-window-counter"]
+)
+def test_redis_limit_is_shared_between_limiters(redis_uri: str, strategy: str) -> None:
+    # One limiter per worker, all counting in the same Redis.
+    limiters = [RateLimiter() for _ in range(2)]
+    for limiter in limiters:
+        limiter.setup(redis_uri, strategy)
+    item = parse("5 per minute")
+
+    allowed = [
+        limiter.strategy.hit(item, "client", "/api/quotes")
+        for _ in range(4)
+        for limiter in limiters
+    ]
+
+    assert allowed == [True] * 5 + [False] * 3
+    _, remaining = limiters[0].strategy.get_window_stats(item, "client", "/api/quotes")
+    assert remaining == 0
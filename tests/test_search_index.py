@@ -0,0 +1,42 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from app.quotes.services import QuoteProvider
+
+
+@pytest.fixture
+def provider(tmp_path: Path) -> QuoteProvider:
+    # 200 words starting with "sav", the quote with the longest text last.
+    quotes = [
+        {
+            "id": i,
+            "quote": f"Keep sav{i:03d} " + "x" * i,
+            "author": "Benjamin Franklin",
+            "type": "practical",
+        }
+        for i in range(1, 201)
+    ]
+    path = tmp_path / "quotes.json"
+    path.write_text(json.dumps(quotes), encoding="utf-8")
+    return QuoteProvider(file_path=path)
+
+
+def test_prefix_matches_every_word_it_starts(provider: QuoteProvider) -> None:
+    quotes, next_cursor = provider.search_quotes("keep sav", limit=200)
+
+    assert [quote.id for quote in quotes] == list(range(1, 201))
+    assert next_cursor is None
+
+
+def test_results_come_shortest_quote_first(provider: QuoteProvider) -> None:
+    first, cursor = provider.search_quotes("sav1", limit=50)
+    second, _ = provider.search_quotes("sav1", cursor=cursor, limit=50)
+
+    assert [quote.id for quote in first + second] == list(range(100, 200))
+
+
+def test_single_letter_prefix_is_rejected(provider: QuoteProvider) -> None:
+    with pytest.raises(ValueError):
+        provider.search_quotes("keep s")